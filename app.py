@@ -1,13 +1,26 @@
-from flask import Flask, jsonify, render_template, request, Response
+from flask import Flask, jsonify, render_template, request, Response, send_file, send_from_directory, g, stream_with_context
 from flask_cors import CORS
 import urllib.parse
 from sqlalchemy import create_engine, text
 import pandas as pd
 import os
-import io
-from datetime import datetime, timedelta
+import json
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+import queue
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import random
+import cProfile
+import functools
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 import traceback
 import logging
+import replica
 
 # Basic logging
 logging.basicConfig(level=logging.INFO)
@@ -15,11 +28,105 @@ logger = logging.getLogger(__name__)
 
 # Cache configuration for monthly stats
 MONTHLY_STATS_CACHE = {
-    'data': None,
-    'timestamp': None,
+    # {data, timestamp, body, etag}, replaced as a whole so readers never mix two
+    # builds. body is the pre-serialized cache-hit response (hits skip copy +
+    # re-encode); etag is a content hash of months/data/totals.
+    'entry': None,
     'ttl_minutes': 1440  # Cache expires after 24 hours
 }
 
+# Column lists per report (schemas change rarely)
+COLUMNS_CACHE = {
+    'reports': {},  # report_type -> {columns, timestamp}
+    'ttl_minutes': 1440
+}
+
+# Recent /api/preview results, valid while the report's source version (from the
+# metadata index) is unchanged. Least-recently-used entries beyond max_entries are dropped.
+PREVIEW_CACHE = {
+    'entries': OrderedDict(),  # (report, n, from, to, cols, categories) -> {payload, source_version}
+    'max_entries': 256,
+    'lock': threading.Lock()
+}
+
+# Cache warm-up: runs once the DB connects and then every interval_minutes, so
+# no user request sees a cold cache. TTL caches are rebuilt refresh_lead_minutes
+# before they would expire.
+WARMUP = {
+    'interval_minutes': int(os.environ.get("WARMUP_INTERVAL_MINUTES", 15)),
+    'refresh_lead_minutes': 60,
+    'preview_rows': 5,
+    'scheduler_started': False,
+    'lock': threading.Lock()
+}
+
+# HTTP caching for read-only JSON endpoints: browsers and proxies may reuse a
+# response for max_age seconds, then revalidate with If-None-Match/If-Modified-Since.
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", 60))
+
+# Export artifact cache: finished export files on disk, keyed by a fingerprint of
+# report + filters + columns + format. Entries are evicted least-recently-used once
+# the total size exceeds max_bytes, and invalidated when the source table changes.
+EXPORT_CACHE = {
+    'dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'export_cache'),
+    'max_bytes': int(os.environ.get("EXPORT_CACHE_MAX_MB", 2048)) * 1024 * 1024,
+    'entries': OrderedDict(),  # fingerprint -> {path, size, source_version}
+    'total_bytes': 0,
+    'lock': threading.Lock()
+}
+
+# Metadata index: per-report date bounds and category values with counts, so
+# /api/dates and /api/categories are in-memory reads. Built lazily on first use
+# and refreshed in the background when the source table changes.
+METADATA_INDEX = {
+    'reports': {},  # report_type -> {min_date, max_date, categories, source_version, ...}
+    'refresh_seconds': int(os.environ.get("METADATA_REFRESH_SECONDS", 300)),
+    'full_rebuild_hours': 24,
+    'refresher_started': False,
+    'lock': threading.Lock(),
+    'refresh_lock': threading.Lock()  # Serializes refresh_metadata_index runs
+}
+
+# Optional local analytics replica (Parquet + DuckDB, see replica.py). When enabled
+# and fresh, previews, monthly stats and metadata are served from local files
+# instead of the shared SQL Server. Stale replicas fall back to SQL Server.
+ANALYTICS_REPLICA = {
+    'enabled': os.environ.get("ANALYTICS_REPLICA", "0") == "1",
+    'dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'replica_data'),
+    'refresh_minutes': int(os.environ.get("REPLICA_REFRESH_MINUTES", 15)),
+    'max_staleness_minutes': int(os.environ.get("REPLICA_MAX_STALENESS_MINUTES", 60)),
+    'refresher_started': False
+}
+if ANALYTICS_REPLICA['enabled'] and not replica.DUCKDB_AVAILABLE:
+    logger.warning("ANALYTICS_REPLICA=1 but duckdb is not installed; replica disabled.")
+    ANALYTICS_REPLICA['enabled'] = False
+
+# On-demand request profiler for /api/export and /api/preview. A request is
+# profiled when it sends X-Profile: 1 with the admin token, or is picked by
+# sample_rate. With no token and a zero sample rate, routes are left unwrapped.
+PROFILER = {
+    'admin_token': os.environ.get("PROFILE_ADMIN_TOKEN"),
+    'sample_rate': float(os.environ.get("PROFILE_SAMPLE_RATE", 0)),
+    'dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'),
+    'max_profiles': 50,
+    'lock': threading.Lock()  # One profiled request at a time (cProfile is process-wide on 3.12+)
+}
+
+# Bundle export (/api/export/bundle): reports are queried concurrently and streamed
+# into one ZIP. Each report buffers at most queue_chunks chunks of chunk_rows rows
+# and holds a pooled DB connection for the whole stream, so a bundle may contain
+# at most max_reports entries.
+BUNDLE_EXPORT = {
+    'chunk_rows': 50000,
+    'queue_chunks': 4,
+    'max_reports': int(os.environ.get("BUNDLE_MAX_REPORTS", 5))
+}
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
 app = Flask(__name__, static_folder='frontend/dist/assets', template_folder='frontend/dist', static_url_path='/assets')
 CORS(app)
 
@@ -77,6 +184,12 @@ REPORT_DATE_COLUMNS = {
 # Default Name of the date column (fallback)
 DATE_COLUMN = "Close Date"
 
+# Category column used by the category filter, per report type
+REPORT_CATEGORY_COLUMNS = {
+    "complaints": "Product Type",
+    "cea": "Policy Type (AI/HI)"
+}
+
 # ---------- FALLBACK / MOCK DATA ----------
 # If the DB cannot be reached, we will use a small in-memory sample DataFrame so the UI still works.
 FALLBACK_DF = pd.DataFrame(
@@ -134,8 +247,8 @@ def try_create_engine():
         INSDTA_ERROR = str(e)
         logger.warning("Secondary Database (INSDTA) connection failed. Error: %s", str(e))
 
-# Initialize engine / test connectivity at startup
-try_create_engine()
+    if DB_AVAILABLE or INSDTA_AVAILABLE:
+        start_background_jobs()
 
 def get_db_context(report_type):
     """
@@ -149,11 +262,873 @@ def get_table_name(report_type):
     """Helper to get table name from report type, defaulting to claims table."""
     return REPORT_TABLES.get(report_type, DEFAULT_TABLE)
 
+
+def get_source_version(report_type):
+    """
+    Returns a (row_count, max_date) tuple describing the current state of the
+    report's source table. The row count comes from sys.partitions (metadata
+    only); MAX of the date column is an index seek when that column is indexed
+    and a full scan otherwise. Returns ("fallback",) when the DB is unavailable
+    and None if the version could not be determined.
+    """
+    current_engine, current_available = get_db_context(report_type)
+    if not current_available or current_engine is None:
+        return ("fallback",)
+
+    table_name = get_table_name(report_type)
+    date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
+    query = text(f"""
+        SELECT
+            (SELECT SUM(p.rows) FROM sys.partitions p
+             WHERE p.object_id = OBJECT_ID(:object_name) AND p.index_id IN (0, 1)) AS row_count,
+            (SELECT MAX([{date_col}]) FROM [{TABLE_SCHEMA}].[{table_name}]) AS max_date
+    """)
+    try:
+        with current_engine.connect() as conn:
+            row = conn.execute(query, {"object_name": f"{TABLE_SCHEMA}.{table_name}"}).fetchone()
+    except Exception as e:
+        logger.warning("Could not read source version for %s. Error: %s", report_type, str(e))
+        return None
+    max_date = str(row[1]) if row[1] is not None else None
+    return (int(row[0] or 0), max_date)
+
+
+# ---------- EXPORT ARTIFACT CACHE ----------
+
+def init_export_cache():
+    """
+    Creates the export cache directory and removes artifacts left over from a
+    previous run (their source versions are unknown, so they cannot be trusted).
+    """
+    os.makedirs(EXPORT_CACHE['dir'], exist_ok=True)
+    for name in os.listdir(EXPORT_CACHE['dir']):
+        try:
+            os.remove(os.path.join(EXPORT_CACHE['dir'], name))
+        except OSError:
+            logger.warning("Could not remove stale export artifact %s", name)
+
+
+def _normalize_filter_date(value):
+    # '2024-1-5', '2024-01-05' and '2024-01-05T00:00' filter the same rows
+    if not value:
+        return None
+    try:
+        return pd.to_datetime(value).isoformat()
+    except Exception:
+        return str(value)
+
+
+def export_fingerprint(report_type, file_format, from_date, to_date, cols, categories):
+    """
+    Builds a stable cache key for an export request. Dates are normalized and
+    categories sorted since neither changes the result; column order is kept as it does.
+    """
+    key = {
+        "report": report_type,
+        "format": file_format,
+        "from": _normalize_filter_date(from_date),
+        "to": _normalize_filter_date(to_date),
+        "cols": cols or [],
+        "categories": sorted(set(categories or [])),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def export_cache_get(fingerprint, source_version):
+    """
+    Returns the cached artifact path for fingerprint, or None on a miss.
+    Entries whose source version no longer matches are dropped.
+    """
+    with EXPORT_CACHE['lock']:
+        entry = EXPORT_CACHE['entries'].get(fingerprint)
+        if entry is None:
+            return None
+        if entry['source_version'] != source_version or not os.path.exists(entry['path']):
+            _export_cache_remove(fingerprint)
+            return None
+        EXPORT_CACHE['entries'].move_to_end(fingerprint)
+        return entry['path']
+
+
+def export_cache_put(fingerprint, source_version, path):
+    """
+    Registers a finished artifact and evicts least-recently-used entries until
+    the cache fits within max_bytes again. The newest entry is always kept.
+    """
+    size = os.path.getsize(path)
+    with EXPORT_CACHE['lock']:
+        if fingerprint in EXPORT_CACHE['entries']:
+            _export_cache_remove(fingerprint)
+        EXPORT_CACHE['entries'][fingerprint] = {
+            'path': path,
+            'size': size,
+            'source_version': source_version,
+        }
+        EXPORT_CACHE['total_bytes'] += size
+        while EXPORT_CACHE['total_bytes'] > EXPORT_CACHE['max_bytes'] and len(EXPORT_CACHE['entries']) > 1:
+            oldest = next(iter(EXPORT_CACHE['entries']))
+            logger.info("Evicting export artifact %s from cache", oldest)
+            _export_cache_remove(oldest)
+
+
+def export_cache_clear():
+    """Drops every cached export artifact."""
+    with EXPORT_CACHE['lock']:
+        for fingerprint in list(EXPORT_CACHE['entries']):
+            _export_cache_remove(fingerprint)
+
+
+def _export_cache_remove(fingerprint):
+    # Caller must hold EXPORT_CACHE['lock']
+    entry = EXPORT_CACHE['entries'].pop(fingerprint)
+    EXPORT_CACHE['total_bytes'] -= entry['size']
+    try:
+        os.remove(entry['path'])
+    except OSError:
+        # File may still be open by an in-flight download (Windows)
+        logger.warning("Could not remove export artifact %s", entry['path'])
+
+
+def send_artifact(f, download_name, mimetype):
+    """
+    send_file for an already-open export artifact. Holding the file open keeps it
+    readable if the cache evicts it meanwhile (POSIX), so the path is never
+    looked up again. Keeps Content-Length, ETag and Range support.
+    """
+    stat = os.fstat(f.fileno())
+    resp = send_file(
+        f,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype,
+        etag=f"{stat.st_mtime}-{stat.st_size}",
+        last_modified=stat.st_mtime
+    )
+    resp.content_length = stat.st_size
+    try:
+        return resp.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+    except Exception:
+        f.close()
+        raise
+
+
+def _remove_untracked_artifact(path):
+    try:
+        os.remove(path)
+    except OSError:
+        logger.warning("Could not remove export artifact %s", path)
+
+
+init_export_cache()
+
+
+# ---------- METADATA INDEX ----------
+
+def format_date(value):
+    """Normalizes a DB date value to a YYYY-MM-DD string (None stays None)."""
+    if value is None:
+        return None
+    try:
+        return pd.to_datetime(value).strftime("%Y-%m-%d")
+    except Exception:
+        return str(value)
+
+
+def build_report_metadata(report_type, previous=None):
+    """
+    Reads date bounds and category counts for a report from the database.
+    If previous is given and only newer rows were appended (row count and max
+    date both grew, and every added row is dated after the previous max date),
+    only those rows are scanned and merged in. Otherwise the full table is scanned.
+    Returns None when the report's database is unavailable.
+    """
+    current_engine, current_available = get_db_context(report_type)
+    if not current_available or current_engine is None:
+        return None
+
+    source_version = get_source_version(report_type)
+    table_name = get_table_name(report_type)
+    date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
+    cat_col = REPORT_CATEGORY_COLUMNS.get(report_type)
+
+    full_rebuild_age = timedelta(hours=METADATA_INDEX['full_rebuild_hours'])
+    incremental = (
+        previous is not None
+        and source_version is not None
+        and previous['source_version'] is not None
+        and previous['max_date_raw'] is not None
+        and datetime.now() - previous['built_at'] < full_rebuild_age
+        and source_version[0] > previous['source_version'][0]
+        and source_version[1] is not None
+        and source_version[1] > previous['source_version'][1]
+    )
+
+    replica_state = replica.REPLICA_STATE['reports'].get(report_type)
+    if replica_ready(report_type) and replica_state['source_version'] == source_version:
+        # Local Parquet scan; cheap enough to always rebuild in full
+        try:
+            min_raw, max_raw = replica.date_bounds(ANALYTICS_REPLICA['dir'], report_type, date_col)
+            counts = replica.category_counts(ANALYTICS_REPLICA['dir'], report_type, cat_col) if cat_col else {}
+        except Exception as e:
+            logger.warning("Replica metadata query failed for %s, using SQL Server. Error: %s", report_type, str(e))
+        else:
+            now = datetime.now()
+            return {
+                'min_date_raw': min_raw,
+                'max_date_raw': max_raw,
+                'min_date': format_date(min_raw),
+                'max_date': format_date(max_raw),
+                'category_counts': counts,
+                'categories': sorted(counts),
+                'source_version': source_version,
+                'built_at': now,
+                'refreshed_at': now
+            }
+
+    where_sql = f" WHERE [{date_col}] > :after" if incremental else ""
+    params_sql = {"after": previous['max_date_raw']} if incremental else {}
+    bounds_sql = f"SELECT MIN([{date_col}]), MAX([{date_col}]), COUNT(*) FROM [{TABLE_SCHEMA}].[{table_name}]"
+
+    with current_engine.connect() as conn:
+        row = conn.execute(text(bounds_sql + where_sql), params_sql).fetchone()
+        if incremental and int(row[2]) != source_version[0] - previous['source_version'][0]:
+            # Some new rows are not after the previous max date (backdated, or on
+            # that same date), so merging the newer rows alone would miss them
+            logger.info("Metadata for %s changed beyond appended rows; rebuilding in full", report_type)
+            incremental = False
+            where_sql = ""
+            params_sql = {}
+            row = conn.execute(text(bounds_sql)).fetchone()
+        min_raw, max_raw = row[0], row[1]
+
+        counts = {}
+        if cat_col:
+            cat_where = f"{where_sql} AND" if where_sql else " WHERE"
+            rows = conn.execute(
+                text(f"SELECT [{cat_col}], COUNT(*) FROM [{TABLE_SCHEMA}].[{table_name}]"
+                     f"{cat_where} [{cat_col}] IS NOT NULL GROUP BY [{cat_col}]"),
+                params_sql
+            ).fetchall()
+            counts = {r[0]: int(r[1]) for r in rows}
+
+    if incremental:
+        merged = dict(previous['category_counts'])
+        for value, count in counts.items():
+            merged[value] = merged.get(value, 0) + count
+        counts = merged
+        min_raw = previous['min_date_raw']
+        max_raw = max_raw if max_raw is not None else previous['max_date_raw']
+        built_at = previous['built_at']
+    else:
+        built_at = datetime.now()
+
+    return {
+        'min_date_raw': min_raw,
+        'max_date_raw': max_raw,
+        'min_date': format_date(min_raw),
+        'max_date': format_date(max_raw),
+        'category_counts': counts,
+        'categories': sorted(counts),
+        'source_version': source_version,
+        'built_at': built_at,
+        'refreshed_at': datetime.now()
+    }
+
+
+def get_report_metadata(report_type):
+    """
+    Returns the indexed metadata for a report, building it on first use.
+    Returns None when the report's database is unavailable.
+    """
+    entry = METADATA_INDEX['reports'].get(report_type)
+    if entry is not None:
+        return entry
+    entry = build_report_metadata(report_type)
+    if entry is not None:
+        with METADATA_INDEX['lock']:
+            METADATA_INDEX['reports'][report_type] = entry
+    return entry
+
+
+def refresh_metadata_index(wait=False):
+    """
+    Refreshes every report whose source version changed since it was indexed,
+    and rebuilds in full any entry older than full_rebuild_hours. Other
+    reports cost one version query each. If a refresh is
+    already running, returns False right away, or with wait=True waits for it
+    to finish and then checks again (finding little left to do).
+    """
+    if not METADATA_INDEX['refresh_lock'].acquire(blocking=wait):
+        return False
+    try:
+        _refresh_metadata_reports()
+    finally:
+        METADATA_INDEX['refresh_lock'].release()
+    return True
+
+
+def _refresh_metadata_reports():
+    full_rebuild_age = timedelta(hours=METADATA_INDEX['full_rebuild_hours'])
+    for report_type in REPORT_TABLES:
+        previous = METADATA_INDEX['reports'].get(report_type)
+        if previous is not None and datetime.now() - previous['built_at'] >= full_rebuild_age:
+            # Catches edits that keep the row count and max date (e.g. a corrected category)
+            previous = None
+        try:
+            if previous is not None and get_source_version(report_type) == previous['source_version']:
+                continue
+            entry = build_report_metadata(report_type, previous)
+        except Exception as e:
+            logger.warning("Metadata index refresh failed for %s. Error: %s", report_type, str(e))
+            continue
+        with METADATA_INDEX['lock']:
+            if entry is None:
+                METADATA_INDEX['reports'].pop(report_type, None)
+            else:
+                METADATA_INDEX['reports'][report_type] = entry
+        if entry is not None:
+            logger.info("Metadata index refreshed for %s", report_type)
+
+
+def start_metadata_refresher():
+    """Runs refresh_metadata_index every refresh_seconds in a daemon thread (once per process)."""
+    if METADATA_INDEX['refresher_started']:
+        return
+    METADATA_INDEX['refresher_started'] = True
+
+    def loop():
+        while True:
+            refresh_metadata_index()
+            time.sleep(METADATA_INDEX['refresh_seconds'])
+
+    threading.Thread(target=loop, name="metadata-refresher", daemon=True).start()
+
+# ---------- ANALYTICS REPLICA ----------
+
+def replica_ready(report_type):
+    """True if queries for this report may be served from the local replica."""
+    return ANALYTICS_REPLICA['enabled'] and replica.is_fresh(report_type, ANALYTICS_REPLICA['max_staleness_minutes'])
+
+
+def refresh_replica():
+    """
+    Syncs the replica of every report whose source version changed. Unchanged
+    reports are just marked as verified (one cheap version query each).
+    """
+    for report_type in REPORT_TABLES:
+        current_engine, current_available = get_db_context(report_type)
+        if not current_available or current_engine is None:
+            continue
+        try:
+            source_version = get_source_version(report_type)
+            if source_version is None:
+                continue
+            state = replica.REPLICA_STATE['reports'].get(report_type) or replica.load_state(ANALYTICS_REPLICA['dir'], report_type)
+            if state is not None and state['source_version'] == source_version:
+                replica.mark_verified(ANALYTICS_REPLICA['dir'], report_type)
+                continue
+            replica.mark_stale(report_type)
+            replica.sync_report(
+                ANALYTICS_REPLICA['dir'],
+                report_type,
+                current_engine,
+                TABLE_SCHEMA,
+                get_table_name(report_type),
+                REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN),
+                source_version
+            )
+        except Exception as e:
+            logger.warning("Replica sync failed for %s. Error: %s", report_type, str(e))
+
+
+def start_replica_refresher():
+    """Runs refresh_replica every refresh_minutes in a daemon thread (once per process)."""
+    if ANALYTICS_REPLICA['refresher_started']:
+        return
+    ANALYTICS_REPLICA['refresher_started'] = True
+
+    def loop():
+        while True:
+            refresh_replica()
+            time.sleep(ANALYTICS_REPLICA['refresh_minutes'] * 60)
+
+    threading.Thread(target=loop, name="replica-refresher", daemon=True).start()
+
+
+if ANALYTICS_REPLICA['enabled']:
+    for _report_type in REPORT_TABLES:
+        replica.load_state(ANALYTICS_REPLICA['dir'], _report_type)
+
+
+# ---------- REQUEST PROFILER ----------
+
+def is_admin_request():
+    """True if the request carries the configured admin token."""
+    token = PROFILER['admin_token']
+    supplied = request.headers.get("X-Admin-Token", "")
+    return bool(token) and hmac.compare_digest(supplied.encode("utf-8"), token.encode("utf-8"))
+
+
+def _should_profile():
+    if request.headers.get("X-Profile") == "1" and is_admin_request():
+        return True
+    return PROFILER['sample_rate'] > 0 and random.random() < PROFILER['sample_rate']
+
+
+def profiled(view):
+    """
+    Wraps a route so selected requests run under cProfile. The stats are saved
+    to PROFILER['dir'] as <id>.prof (pstats format; open with snakeviz or
+    convert with flameprof/gprof2dot) plus <id>.json with the request's report,
+    filters, row count and duration. Routes set g.profile_row_count.
+    """
+    if not PROFILER['admin_token'] and PROFILER['sample_rate'] <= 0:
+        return view  # Profiling is off: no wrapper, no overhead
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _should_profile():
+            return view(*args, **kwargs)
+        if not PROFILER['lock'].acquire(blocking=False):
+            # Another request is being profiled; serve this one unprofiled
+            return view(*args, **kwargs)
+
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                return profiler.runcall(view, *args, **kwargs)
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                try:
+                    _save_profile(profiler, view.__name__, duration_ms)
+                except Exception:
+                    logger.exception("Could not save request profile")
+        finally:
+            PROFILER['lock'].release()
+
+    return wrapper
+
+
+def _save_profile(profiler, endpoint, duration_ms):
+    os.makedirs(PROFILER['dir'], exist_ok=True)
+    profile_id = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}_{endpoint}_{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(PROFILER['dir'], f"{profile_id}.prof"))
+    meta = {
+        "id": profile_id,
+        "endpoint": endpoint,
+        "report": request.args.get("report", "claims"),
+        "filters": request.args.to_dict(),
+        "row_count": getattr(g, "profile_row_count", None),
+        "duration_ms": round(duration_ms, 1),
+        "created_at": datetime.utcnow().isoformat() + "Z"
+    }
+    with open(os.path.join(PROFILER['dir'], f"{profile_id}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    logger.info("Saved request profile %s (%.0f ms)", profile_id, duration_ms)
+
+    # Keep only the most recent max_profiles
+    ids = sorted(name[:-5] for name in os.listdir(PROFILER['dir']) if name.endswith(".json"))
+    for old_id in ids[:-PROFILER['max_profiles']]:
+        for ext in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(PROFILER['dir'], old_id + ext))
+            except OSError:
+                pass
+
+
+# ---------- CACHE WARM-UP ----------
+
+def cache_expired(timestamp, ttl_minutes, lead_minutes=0):
+    """True if a cache entry stamped at timestamp is older than ttl_minutes - lead_minutes."""
+    if timestamp is None:
+        return True
+    return datetime.now() - timestamp >= timedelta(minutes=ttl_minutes - lead_minutes)
+
+
+def _preview_source_version(report_type):
+    entry = METADATA_INDEX['reports'].get(report_type if report_type in REPORT_TABLES else "claims")
+    return entry['source_version'] if entry is not None else None
+
+
+def preview_cache_get(key, report_type):
+    """Returns a cached preview payload, or None if missing or out of date."""
+    source_version = _preview_source_version(report_type)
+    with PREVIEW_CACHE['lock']:
+        entry = PREVIEW_CACHE['entries'].get(key)
+        if entry is None or source_version is None or entry['source_version'] != source_version:
+            return None
+        PREVIEW_CACHE['entries'].move_to_end(key)
+        return entry['payload']
+
+
+def preview_cache_put(key, report_type, payload):
+    source_version = _preview_source_version(report_type)
+    if source_version is None:
+        return
+    with PREVIEW_CACHE['lock']:
+        PREVIEW_CACHE['entries'][key] = {'payload': payload, 'source_version': source_version}
+        PREVIEW_CACHE['entries'].move_to_end(key)
+        while len(PREVIEW_CACHE['entries']) > PREVIEW_CACHE['max_entries']:
+            PREVIEW_CACHE['entries'].popitem(last=False)
+
+
+def _is_reloader_parent():
+    # Under `python app.py` with debug=True, the first process only watches files;
+    # the app is served (and caches used) by the WERKZEUG_RUN_MAIN child.
+    return __name__ == "__main__" and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+
+
+def _warm(label, func, *args):
+    try:
+        func(*args)
+    except Exception as e:
+        logger.warning("Cache warm-up step '%s' failed. Error: %s", label, str(e))
+
+
+def warm_caches():
+    """
+    Precomputes monthly stats, date bounds, columns, categories and the
+    default-range preview for every report. Entries that are still fresh are
+    skipped, so repeated runs are cheap. Only one run happens at a time.
+    """
+    if not WARMUP['lock'].acquire(blocking=False):
+        return
+    try:
+        start = time.perf_counter()
+        lead = WARMUP['refresh_lead_minutes']
+
+        stats = MONTHLY_STATS_CACHE['entry']
+        if DB_AVAILABLE and (
+            stats is None or stats['data'].get('fallback')
+            or cache_expired(stats['timestamp'], MONTHLY_STATS_CACHE['ttl_minutes'], lead)
+        ):
+            _warm("monthly stats", build_monthly_stats)
+
+        # Date bounds and categories: builds missing entries, refreshes changed ones.
+        # Waits for a running metadata refresher, since the previews below need the bounds.
+        _warm("metadata index", refresh_metadata_index, True)
+
+        for report_type in REPORT_TABLES:
+            current_engine, current_available = get_db_context(report_type)
+            if not current_available or current_engine is None:
+                continue
+
+            columns = COLUMNS_CACHE['reports'].get(report_type)
+            if columns is None or cache_expired(columns['timestamp'], COLUMNS_CACHE['ttl_minutes'], lead):
+                _warm(f"columns {report_type}", get_report_columns, report_type, True)
+
+            _warm(f"preview {report_type}", _warm_default_preview, report_type)
+
+        logger.info("Cache warm-up finished in %.1fs", time.perf_counter() - start)
+    finally:
+        WARMUP['lock'].release()
+
+
+def _warm_default_preview(report_type):
+    """Caches the preview for the report's full date range (the slicer's default)."""
+    metadata = METADATA_INDEX['reports'].get(report_type)
+    if metadata is None:
+        return
+    n = WARMUP['preview_rows']
+    from_date, to_date = metadata['min_date'] or None, metadata['max_date'] or None
+    if preview_cache_get(preview_cache_key(report_type, n, from_date, to_date), report_type) is None:
+        query_preview(report_type, n, from_date, to_date)
+
+
+def start_cache_warmup():
+    """
+    Runs warm_caches now in a background thread, and starts the scheduler that
+    repeats it every WARMUP['interval_minutes'] (once per process).
+    """
+    threading.Thread(target=warm_caches, name="cache-warmup", daemon=True).start()
+
+    if WARMUP['scheduler_started']:
+        return
+    WARMUP['scheduler_started'] = True
+
+    def loop():
+        while True:
+            time.sleep(WARMUP['interval_minutes'] * 60)
+            warm_caches()
+
+    threading.Thread(target=loop, name="cache-warmup-scheduler", daemon=True).start()
+
+
+def start_background_jobs():
+    """
+    Starts the cache warm-up, the metadata index refresher and (if enabled) the
+    replica refresher. Called after every successful DB connect; the
+    schedulers themselves start only once per process.
+    """
+    if _is_reloader_parent():
+        return
+    start_cache_warmup()
+    start_metadata_refresher()
+    if ANALYTICS_REPLICA['enabled']:
+        start_replica_refresher()
+
+
+# ---------- EXPORT QUERIES ----------
+
+def build_export_query(report_type, from_date=None, to_date=None, cols=None, categories=None):
+    """
+    Builds the SELECT for an export of report_type with the given filters.
+    cols and categories are lists (None or empty means no restriction).
+    Returns (sqlalchemy text query, params dict).
+    """
+    table_name = get_table_name(report_type)
+    date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
+
+    # Basic safety: ensure column names don't contain semicolons, DROP, or suspicious tokens
+    safe_cols = [f"[{c}]" for c in (cols or []) if not (";" in c or "--" in c or "/*" in c)]
+    select_cols = ", ".join(safe_cols) if safe_cols else "*"
+
+    where_clauses = []
+    params_sql = {}
+    if from_date:
+        where_clauses.append(f"[{date_col}] >= :from_date")
+        params_sql["from_date"] = from_date
+    if to_date:
+        where_clauses.append(f"[{date_col}] <= :to_date")
+        params_sql["to_date"] = to_date
+
+    cat_col = REPORT_CATEGORY_COLUMNS.get(report_type)
+    if categories and cat_col:
+        cat_params = []
+        for i, cat in enumerate(categories):
+            pname = f"cat_{i}"
+            cat_params.append(f":{pname}")
+            params_sql[pname] = cat
+        where_clauses.append(f"[{cat_col}] IN ({', '.join(cat_params)})")
+
+    where_sql = ""
+    if where_clauses:
+        where_sql = " WHERE " + " AND ".join(where_clauses)
+    return text(f"SELECT {select_cols} FROM [{TABLE_SCHEMA}].[{table_name}]{where_sql}"), params_sql
+
+
+def fallback_export_df(report_type, from_date=None, to_date=None, cols=None, categories=None):
+    """Applies export filters to FALLBACK_DF (used when the DB is unavailable)."""
+    df = FALLBACK_DF.copy()
+    if cols:
+        keep = [c for c in cols if c in df.columns]
+        if keep:
+            df = df[keep]
+    # apply date filters if possible
+    try:
+        if from_date and DATE_COLUMN in df.columns:
+            df = df[pd.to_datetime(df[DATE_COLUMN]) >= pd.to_datetime(from_date)]
+        if to_date and DATE_COLUMN in df.columns:
+            df = df[pd.to_datetime(df[DATE_COLUMN]) <= pd.to_datetime(to_date)]
+    except Exception:
+        # ignore date parse errors
+        pass
+
+    cat_col = REPORT_CATEGORY_COLUMNS.get(report_type)
+    if categories and cat_col and cat_col in df.columns:
+        df = df[df[cat_col].isin(categories)]
+    return df
+
+
+# ---------- BUNDLE EXPORT ----------
+
+class _ZipStream:
+    """
+    Write-only, unseekable sink for zipfile. ZipFile then writes data
+    descriptors instead of seeking back, so the archive can be streamed.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_BUNDLE_DONE = object()
+
+
+def _put_until_cancelled(q, item, cancel):
+    # Blocks while the consumer is behind, but gives up once the response is closed
+    while not cancel.is_set():
+        try:
+            q.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce_report_csv(spec, chunks, ready, cancel):
+    """
+    Runs one report's export query on its own engine and feeds CSV-encoded
+    chunks into chunks. Announces itself on ready when its first chunk (or
+    an error) is available, then ends with _BUNDLE_DONE or an Exception.
+    """
+    announced = False
+    try:
+        report_type = spec['report']
+        current_engine, current_available = get_db_context(report_type)
+        if current_available and current_engine is not None:
+            query, params_sql = build_export_query(
+                report_type, spec.get('from'), spec.get('to'), spec.get('cols'), spec.get('categories')
+            )
+            with current_engine.connect() as conn:
+                # pyodbc fetches rows from the server as each chunk is read
+                frames = pd.read_sql(query, conn, params=params_sql, chunksize=BUNDLE_EXPORT['chunk_rows'])
+                for i, frame in enumerate(frames):
+                    data = frame.to_csv(index=False, header=(i == 0)).encode("utf-8")
+                    if not _put_until_cancelled(chunks, data, cancel):
+                        return
+                    if not announced:
+                        ready.put(spec['member'])
+                        announced = True
+        else:
+            df = fallback_export_df(report_type, spec.get('from'), spec.get('to'), spec.get('cols'), spec.get('categories'))
+            _put_until_cancelled(chunks, df.to_csv(index=False).encode("utf-8"), cancel)
+        _put_until_cancelled(chunks, _BUNDLE_DONE, cancel)
+    except Exception as e:
+        logger.exception("Bundle export failed for %s", spec.get('report'))
+        _put_until_cancelled(chunks, e, cancel)
+    finally:
+        if not announced:
+            ready.put(spec['member'])
+
+
+def parse_bundle_specs(payload):
+    """
+    Normalizes a bundle request into a list of per-report specs. payload['reports']
+    is a list (or comma-separated string) of report names, where list entries may
+    also be dicts with 'report' plus optional 'from', 'to', 'cols', 'categories'
+    overriding the shared top-level filters. Raises ValueError for invalid input.
+    """
+    def as_list(value):
+        if value is None or isinstance(value, list):
+            return value
+        return [v.strip() for v in str(value).split(",") if v.strip()]
+
+    reports = payload.get('reports')
+    if reports is not None and not isinstance(reports, (list, str)):
+        raise ValueError("'reports' must be a list or a comma-separated string")
+    reports = as_list(reports) or []
+    if not reports:
+        raise ValueError("At least one report is required")
+    if len(reports) > BUNDLE_EXPORT['max_reports']:
+        raise ValueError(f"A bundle can contain at most {BUNDLE_EXPORT['max_reports']} reports")
+
+    shared = {key: payload.get(key) for key in ('from', 'to', 'cols', 'categories')}
+    now = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    specs = []
+    seen = {}
+    for entry in reports:
+        spec = dict(shared)
+        if isinstance(entry, dict):
+            spec.update({k: v for k, v in entry.items() if v is not None})
+        else:
+            spec['report'] = entry
+        if spec.get('report') not in REPORT_TABLES:
+            raise ValueError(f"Unknown report: {spec.get('report')}")
+        spec['cols'] = as_list(spec.get('cols'))
+        spec['categories'] = as_list(spec.get('categories'))
+
+        # The same report may appear twice with different filters
+        seen[spec['report']] = seen.get(spec['report'], 0) + 1
+        suffix = f"_{seen[spec['report']]}" if seen[spec['report']] > 1 else ""
+        spec['member'] = f"{spec['report']}{suffix}_export_{now}.csv"
+        specs.append(spec)
+    return specs
+
+
+def stream_bundle_zip(specs):
+    """
+    Generator yielding a ZIP archive with one CSV member per spec. All reports
+    are queried concurrently; members are written in the order their data
+    starts arriving, and no member is ever held fully in memory.
+    """
+    cancel = threading.Event()
+    ready = queue.Queue()
+    queues = {spec['member']: queue.Queue(maxsize=BUNDLE_EXPORT['queue_chunks']) for spec in specs}
+    executor = ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix="bundle-export")
+    for spec in specs:
+        executor.submit(_produce_report_csv, spec, queues[spec['member']], ready, cancel)
+
+    sink = _ZipStream()
+    try:
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for _ in specs:
+                member = ready.get()
+                chunks = queues[member]
+                error = None
+                with zf.open(member, mode="w", force_zip64=True) as out:
+                    while True:
+                        item = chunks.get()
+                        if item is _BUNDLE_DONE:
+                            break
+                        if isinstance(item, Exception):
+                            error = item
+                            break
+                        out.write(item)
+                        yield sink.drain()
+                if error is not None:
+                    # Headers are already sent, so report the failure inside the archive
+                    zf.writestr(f"{member[:-4]}_ERROR.txt", f"Export failed: {error}\n")
+                yield sink.drain()
+        yield sink.drain()
+    finally:
+        cancel.set()
+        executor.shutdown(wait=False)
+
+
+# ---------- HTTP CACHING ----------
+
+def content_etag(payload):
+    """Returns a stable content hash for a JSON-serializable payload."""
+    body = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def conditional_json(payload=None, body=None, etag=None, last_modified=None, weak=False):
+    """
+    Builds a JSON response with ETag, Last-Modified and Cache-Control headers,
+    answering 304 Not Modified when the client's copy is still current.
+    Pass body/etag to reuse a pre-serialized response; otherwise they are
+    derived from payload. Fallback (sample data) responses are never stored.
+    """
+    if body is None:
+        body = json.dumps(payload, default=str)
+    if etag is None:
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+    resp = app.response_class(body, mimetype="application/json")
+    resp.set_etag(etag, weak=weak)
+    if last_modified is not None:
+        resp.last_modified = last_modified.astimezone(timezone.utc)
+    if payload is not None and payload.get("fallback"):
+        resp.cache_control.no_store = True
+    else:
+        resp.cache_control.public = True
+        resp.cache_control.max_age = HTTP_CACHE_MAX_AGE
+        resp.cache_control.must_revalidate = True
+    return resp.make_conditional(request)
+
+
 @app.route("/api/retry-db", methods=["POST", "GET"])
 def retry_db():
     """
     Forces a reconnection attempt to databases.
     """
+    # Engines change; rebuild metadata against the new connections
+    with METADATA_INDEX['lock']:
+        METADATA_INDEX['reports'].clear()
     try_create_engine()
     return api_status()
 
@@ -177,36 +1152,23 @@ def get_dates():
     """
     Returns min and max values for DATE_COLUMN for the configured table.
     Used by the frontend to initialize the date slicer (min/max/default).
+    Read from the metadata index, so no table scan per request.
     Falls back to sample data when DB unavailable.
     Query param: report (optional, defaults to claims)
     """
     report_type = request.args.get("report", "claims")
-    table_name = get_table_name(report_type)
-    date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
+    if report_type not in REPORT_TABLES:
+        report_type = "claims"  # unknown reports read the default table
     current_engine, current_available = get_db_context(report_type)
     
     try:
         if current_available and current_engine is not None:
-            query = text(f"SELECT MIN([{date_col}]) AS min_date, MAX([{date_col}]) AS max_date FROM [{TABLE_SCHEMA}].[{table_name}]")
-            with current_engine.connect() as conn:
-                row = conn.execute(query).fetchone()
-                # row can be tuple-like; ensure safe extraction
-                min_date = row[0]
-                max_date = row[1]
-            # Normalize to YYYY-MM-DD strings (if not None)
-            min_s = None
-            max_s = None
-            if min_date is not None:
-                try:
-                    min_s = pd.to_datetime(min_date).strftime("%Y-%m-%d")
-                except Exception:
-                    min_s = str(min_date)
-            if max_date is not None:
-                try:
-                    max_s = pd.to_datetime(max_date).strftime("%Y-%m-%d")
-                except Exception:
-                    max_s = str(max_date)
-            return jsonify({"min": min_s, "max": max_s, "fallback": False})
+            # Served from the metadata index (refreshed in the background)
+            metadata = get_report_metadata(report_type)
+            return conditional_json(
+                {"min": metadata['min_date'], "max": metadata['max_date'], "fallback": False},
+                last_modified=metadata['refreshed_at']
+            )
         else:
             # Use fallback DataFrame
             if DATE_COLUMN in FALLBACK_DF.columns:
@@ -228,6 +1190,39 @@ def get_dates():
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
+def get_report_columns(report_type, refresh=False):
+    """
+    Returns the cache entry {columns, timestamp} for a report's table, cached
+    for COLUMNS_CACHE['ttl_minutes']. refresh=True re-reads it from the database.
+    """
+    entry = COLUMNS_CACHE['reports'].get(report_type)
+    if entry is not None and not refresh and not cache_expired(entry['timestamp'], COLUMNS_CACHE['ttl_minutes']):
+        return entry
+
+    table_name = get_table_name(report_type)
+    current_engine, _ = get_db_context(report_type)
+    sql = text("""
+        SELECT COLUMN_NAME
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME = :table_name
+          AND TABLE_SCHEMA = :table_schema
+        ORDER BY ORDINAL_POSITION
+    """)
+    with current_engine.connect() as conn:
+        result = conn.execute(sql, {"table_name": table_name, "table_schema": TABLE_SCHEMA})
+        cols = [row[0] for row in result.fetchall()]
+    # If no columns returned, fall back to reading zero rows
+    if not cols:
+        # Try a safe sample query to inspect columns
+        with current_engine.connect() as conn:
+            sample = conn.execute(text(f"SELECT TOP 1 * FROM [{TABLE_SCHEMA}].[{table_name}]")).fetchone()
+            if sample is not None:
+                cols = list(sample.keys()) if hasattr(sample, 'keys') else []
+    entry = {'columns': cols, 'timestamp': datetime.now()}
+    COLUMNS_CACHE['reports'][report_type] = entry
+    return entry
+
+
 @app.route("/api/columns", methods=["GET"])
 def get_columns():
     """
@@ -236,29 +1231,12 @@ def get_columns():
     Query param: report (optional, defaults to claims)
     """
     report_type = request.args.get("report", "claims")
-    table_name = get_table_name(report_type)
     current_engine, current_available = get_db_context(report_type)
 
     try:
         if current_available and current_engine is not None:
-            sql = text("""
-                SELECT COLUMN_NAME
-                FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_NAME = :table_name
-                  AND TABLE_SCHEMA = :table_schema
-                ORDER BY ORDINAL_POSITION
-            """)
-            with current_engine.connect() as conn:
-                result = conn.execute(sql, {"table_name": table_name, "table_schema": TABLE_SCHEMA})
-                cols = [row[0] for row in result.fetchall()]
-            # If no columns returned, fall back to reading zero rows
-            if not cols:
-                # Try a safe sample query to inspect columns
-                with engine.connect() as conn:
-                    sample = conn.execute(text(f"SELECT TOP 1 * FROM [{TABLE_SCHEMA}].[{table_name}]")).fetchone()
-                    if sample is not None:
-                        cols = list(sample.keys()) if hasattr(sample, 'keys') else []
-            return jsonify({"columns": cols})
+            entry = get_report_columns(report_type)
+            return conditional_json({"columns": entry['columns']}, last_modified=entry['timestamp'])
         else:
             # Fallback: use columns from FALLBACK_DF
             cols = list(FALLBACK_DF.columns)
@@ -271,7 +1249,8 @@ def get_columns():
 @app.route("/api/categories", methods=["GET"])
 def get_categories():
     """
-    Returns a list of distinct Categories for the complaints table.
+    Returns a list of distinct Categories (with row counts) for the complaints
+    or CEA table, read from the metadata index.
     Falls back to sample data if DB is not available.
     """
     try:
@@ -279,21 +1258,17 @@ def get_categories():
         current_engine, current_available = get_db_context(report_type)
 
         if current_available and current_engine is not None:
-            if report_type == 'cea':
-                # CEA uses "Policy Type (AI/HI)"
-                col_name = "Policy Type (AI/HI)"
-                table_name = REPORT_TABLES.get("cea")
-                query = text(f"SELECT DISTINCT [{col_name}] FROM [{TABLE_SCHEMA}].[{table_name}] WHERE [{col_name}] IS NOT NULL ORDER BY [{col_name}]")
-            else:
-                # Complaints uses "Product Type"
-                # For others, default or empty
-                table_name = REPORT_TABLES.get("complaints")
-                query = text(f"SELECT DISTINCT [Product Type] FROM [{TABLE_SCHEMA}].[{table_name}] WHERE [Product Type] IS NOT NULL ORDER BY [Product Type]")
-            
-            with current_engine.connect() as conn:
-                rows = conn.execute(query).fetchall()
-            categories = [row[0] for row in rows]
-            return jsonify({"categories": categories})
+            # CEA uses "Policy Type (AI/HI)"; complaints and all others use the
+            # complaints table's "Product Type". Served from the metadata index.
+            index_report = 'cea' if report_type == 'cea' else 'complaints'
+            metadata = get_report_metadata(index_report)
+            if metadata is None:
+                # The complaints table lives on a different database that is unavailable
+                return jsonify({"categories": [], "counts": {}})
+            return conditional_json(
+                {"categories": metadata['categories'], "counts": metadata['category_counts']},
+                last_modified=metadata['refreshed_at']
+            )
         else:
             if report_type == 'cea':
                  return jsonify({
@@ -309,7 +1284,102 @@ def get_categories():
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
+def preview_cache_key(report_type, n, from_date=None, to_date=None, cols_param=None, categories_param=None):
+    return (report_type, n, from_date or None, to_date or None, cols_param or None, categories_param or None)
+
+
+def query_preview(report_type, n, from_date=None, to_date=None, cols_param=None, categories_param=None):
+    """
+    Runs the /api/preview query for a report whose database is available (from
+    the local replica when it is fresh, otherwise from SQL Server) and stores
+    the result in PREVIEW_CACHE. Used by the route and the cache warm-up.
+    Returns the response dict.
+    """
+    table_name = get_table_name(report_type)
+    date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
+    current_engine, _ = get_db_context(report_type)
+    cache_key = preview_cache_key(report_type, n, from_date, to_date, cols_param, categories_param)
+
+    # Build select clause from 'cols' param
+    if cols_param:
+        cols = [c.strip() for c in cols_param.split(",") if c.strip()]
+        # Basic safety: ensure column names don't contain malicious tokens
+        safe_cols = []
+        for c in cols:
+            if ";" in c or "--" in c or "/*" in c:
+                continue
+            safe_cols.append(f"[{c}]") # wrap in brackets
+        if not safe_cols:
+            select_cols = "*"
+        else:
+            select_cols = ", ".join(safe_cols)
+    else:
+        select_cols = "*"
+
+    if replica_ready(report_type):
+        try:
+            cat_col = REPORT_CATEGORY_COLUMNS.get(report_type)
+            df = replica.preview(
+                ANALYTICS_REPLICA['dir'],
+                report_type,
+                n,
+                date_col,
+                from_date=from_date,
+                to_date=to_date,
+                cols=[c[1:-1] for c in safe_cols] if cols_param else None,
+                category_col=cat_col,
+                categories=[c.strip() for c in categories_param.split(",") if c.strip()] if categories_param and cat_col else None
+            )
+            payload = {"rows": df.to_dict(orient="records"), "columns": list(df.columns), "source": "replica"}
+            preview_cache_put(cache_key, report_type, payload)
+            return payload
+        except Exception as e:
+            logger.warning("Replica preview failed for %s, using SQL Server. Error: %s", report_type, str(e))
+
+    where_clauses = []
+    params_sql = {}
+    # Use bracketed column name to support spaces/special chars
+    if from_date:
+        where_clauses.append(f"[{date_col}] >= :from_date")
+        params_sql["from_date"] = from_date
+    if to_date:
+        where_clauses.append(f"[{date_col}] <= :to_date")
+        params_sql["to_date"] = to_date
+    
+    if categories_param:
+        if report_type == 'complaints':
+            cats = [c.strip() for c in categories_param.split(",") if c.strip()]
+            if cats:
+                cat_params = []
+                for i, cat in enumerate(cats):
+                    pname = f"cat_{i}"
+                    cat_params.append(f":{pname}")
+                    params_sql[pname] = cat
+                where_clauses.append(f"[Product Type] IN ({', '.join(cat_params)})")
+        elif report_type == 'cea':
+            cats = [c.strip() for c in categories_param.split(",") if c.strip()]
+            if cats:
+                cat_params = []
+                for i, cat in enumerate(cats):
+                    pname = f"cat_{i}"
+                    cat_params.append(f":{pname}")
+                    params_sql[pname] = cat
+                where_clauses.append(f"[Policy Type (AI/HI)] IN ({', '.join(cat_params)})")
+
+    where_sql = ""
+    if where_clauses:
+        where_sql = " WHERE " + " AND ".join(where_clauses)
+    query = text(f"SELECT TOP {n} {select_cols} FROM [{TABLE_SCHEMA}].[{table_name}]{where_sql}")
+    with current_engine.connect() as conn:
+        df = pd.read_sql(query, conn, params=params_sql)
+    data = df.to_dict(orient="records")
+    payload = {"rows": data, "columns": list(df.columns)}
+    preview_cache_put(cache_key, report_type, payload)
+    return payload
+
+
 @app.route("/api/preview", methods=["GET"])
+@profiled
 def get_preview():
     """
     Returns top N rows (default 5) from the configured table as JSON.
@@ -332,65 +1402,16 @@ def get_preview():
         cols_param = request.args.get("cols", None)
         categories_param = request.args.get("categories", None)
         report_type = request.args.get("report", "claims")
-        table_name = get_table_name(report_type)
-        date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
-
-        # Build select clause from 'cols' param
-        if cols_param:
-            cols = [c.strip() for c in cols_param.split(",") if c.strip()]
-            # Basic safety: ensure column names don't contain malicious tokens
-            safe_cols = []
-            for c in cols:
-                if ";" in c or "--" in c or "/*" in c:
-                    continue
-                safe_cols.append(f"[{c}]") # wrap in brackets
-            if not safe_cols:
-                select_cols = "*"
-            else:
-                select_cols = ", ".join(safe_cols)
-        else:
-            select_cols = "*"
         current_engine, current_available = get_db_context(report_type)
 
         if current_available and current_engine is not None:
-            where_clauses = []
-            params_sql = {}
-            # Use bracketed column name to support spaces/special chars
-            if from_date:
-                where_clauses.append(f"[{date_col}] >= :from_date")
-                params_sql["from_date"] = from_date
-            if to_date:
-                where_clauses.append(f"[{date_col}] <= :to_date")
-                params_sql["to_date"] = to_date
-            
-            if categories_param:
-                if report_type == 'complaints':
-                    cats = [c.strip() for c in categories_param.split(",") if c.strip()]
-                    if cats:
-                        cat_params = []
-                        for i, cat in enumerate(cats):
-                            pname = f"cat_{i}"
-                            cat_params.append(f":{pname}")
-                            params_sql[pname] = cat
-                        where_clauses.append(f"[Product Type] IN ({', '.join(cat_params)})")
-                elif report_type == 'cea':
-                    cats = [c.strip() for c in categories_param.split(",") if c.strip()]
-                    if cats:
-                        cat_params = []
-                        for i, cat in enumerate(cats):
-                            pname = f"cat_{i}"
-                            cat_params.append(f":{pname}")
-                            params_sql[pname] = cat
-                        where_clauses.append(f"[Policy Type (AI/HI)] IN ({', '.join(cat_params)})")
-
-            where_sql = ""
-            if where_clauses:
-                where_sql = " WHERE " + " AND ".join(where_clauses)
-            query = text(f"SELECT TOP {n} {select_cols} FROM [{TABLE_SCHEMA}].[{table_name}]{where_sql}")
-            with current_engine.connect() as conn:
-                df = pd.read_sql(query, conn, params=params_sql)
-            data = df.to_dict(orient="records")
-            return jsonify({"rows": data, "columns": list(df.columns)})
+            payload = preview_cache_get(
+                preview_cache_key(report_type, n, from_date, to_date, cols_param, categories_param), report_type
+            )
+            if payload is None:
+                payload = query_preview(report_type, n, from_date, to_date, cols_param, categories_param)
+            g.profile_row_count = len(payload["rows"])
+            return jsonify(payload)
         else:
             # Filter fallback DF by date column if applicable
             df = FALLBACK_DF.copy()
@@ -421,12 +1442,120 @@ def get_preview():
                          df = df[df['Policy Type (AI/HI)'].isin(cats)]
                     
             df = df.head(n)
+            g.profile_row_count = len(df)
             return jsonify({"rows": df.to_dict(orient="records"), "columns": list(df.columns), "fallback": True})
     except Exception as e:
         logger.exception("Error in /api/preview")
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
+def build_monthly_stats():
+    """
+    Aggregates monthly stats from the best available source and stores the
+    result in MONTHLY_STATS_CACHE. Used by /api/monthly-stats on a cache miss
+    and by the warm-up job to refresh the cache before it expires.
+    Returns the new cache entry, or None if the fallback data has no usable columns.
+    """
+    df = None
+    if DB_AVAILABLE and engine is not None and replica_ready("claims"):
+        try:
+            df = replica.monthly_stats(ANALYTICS_REPLICA['dir'], "claims", DATE_COLUMN, "Insurance Type")
+            data_source = "replica"
+            logger.info("Using local analytics replica for monthly stats")
+        except Exception as e:
+            logger.warning("Replica monthly stats failed, using SQL Server. Error: %s", str(e))
+            df = None
+
+    if df is not None:
+        # Served from the replica
+        pass
+    elif DB_AVAILABLE and engine is not None:
+        # Try to query the pre-aggregated summary table first (MUCH faster)
+        try:
+            query = text("""
+                SELECT 
+                    [YearMonth] AS month,
+                    [InsuranceType] AS insurance_type,
+                    [RecordCount] AS count
+                FROM [dbo].[Tbl_MonthlyDataSummary]
+                ORDER BY [YearMonth], [InsuranceType]
+            """)
+            with engine.connect() as conn:
+                df = pd.read_sql(query, conn)
+            data_source = "summary_table"
+            logger.info("Using pre-aggregated summary table for monthly stats (fast)")
+        except Exception:
+            # Summary table doesn't exist or query failed, fall back to original aggregation
+            logger.info("Summary table 'Tbl_MonthlyDataSummary' not found or invalid. Using on-the-fly aggregation.")
+            query = text(f"""
+                SELECT 
+                    FORMAT([{DATE_COLUMN}], 'yyyy-MM') AS month,
+                    [Insurance Type] AS insurance_type,
+                    COUNT(*) AS count
+                FROM [{TABLE_SCHEMA}].[{DEFAULT_TABLE}]
+                WHERE [{DATE_COLUMN}] IS NOT NULL
+                GROUP BY FORMAT([{DATE_COLUMN}], 'yyyy-MM'), [Insurance Type]
+                ORDER BY FORMAT([{DATE_COLUMN}], 'yyyy-MM')
+            """)
+            with engine.connect() as conn:
+                df = pd.read_sql(query, conn)
+            data_source = "on_the_fly_aggregation"
+    else:
+        # Fallback: use sample data
+        df = FALLBACK_DF.copy()
+        if DATE_COLUMN in df.columns and "Insurance Type" in df.columns:
+            df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
+            df['month'] = df[DATE_COLUMN].dt.strftime('%Y-%m')
+            df = df.groupby(['month', 'Insurance Type']).size().reset_index(name='count')
+            df.rename(columns={'Insurance Type': 'insurance_type'}, inplace=True)
+        else:
+            # If columns don't exist, there is nothing to cache
+            return None
+        data_source = "fallback_sample"
+
+    # Transform data into the desired format
+    months = sorted(df['month'].unique().tolist())
+    insurance_types = df['insurance_type'].unique().tolist()
+    
+    # Build data structure
+    data = {}
+    for ins_type in insurance_types:
+        data[ins_type] = []
+        for month in months:
+            count = df[(df['month'] == month) & (df['insurance_type'] == ins_type)]['count'].sum()
+            data[ins_type].append(int(count))
+    
+    # Calculate totals per month
+    totals = []
+    for month in months:
+        total = df[df['month'] == month]['count'].sum()
+        totals.append(int(total))
+    
+    response_data = {
+        "months": months,
+        "data": data,
+        "totals": totals,
+        "fallback": not DB_AVAILABLE,
+        "source": data_source
+    }
+    
+    # Store in cache, along with the serialized cache-hit response and its ETag.
+    # The ETag covers only the data, so the fresh and cached responses (which
+    # differ in 'source'/'cached_at') validate against each other (weak ETag).
+    timestamp = datetime.now()
+    cached_response = dict(response_data, source='cache', cached_at=timestamp.isoformat())
+    entry = {
+        'data': response_data,
+        'timestamp': timestamp,
+        'body': json.dumps(cached_response, default=str),
+        'etag': content_etag({"months": months, "data": data, "totals": totals})
+    }
+    MONTHLY_STATS_CACHE['entry'] = entry
+    logger.info(f"Monthly stats cached successfully (expires in {MONTHLY_STATS_CACHE['ttl_minutes']} minutes)")
+
+    return entry
+
+
 @app.route("/api/monthly-stats", methods=["GET"])
 def get_monthly_stats():
     """
@@ -436,131 +1565,104 @@ def get_monthly_stats():
     
     PERFORMANCE: 
     1. Checks in-memory cache first (instant response)
-    2. If cache expired, tries pre-aggregated Tbl_MonthlyDataSummary table (fast)
-    3. Falls back to on-the-fly aggregation if summary table doesn't exist (slower)
+    2. If cache expired, uses the local analytics replica when enabled and fresh
+    3. Otherwise tries pre-aggregated Tbl_MonthlyDataSummary table (fast)
+    4. Falls back to on-the-fly aggregation if summary table doesn't exist (slower)
     
     Cache expires after 5 minutes to ensure data freshness.
     """
     global MONTHLY_STATS_CACHE
     
     try:
-        # Check if we have valid cached data
+        # Check if we have valid cached data (one snapshot; the warm-up may replace it)
+        entry = MONTHLY_STATS_CACHE['entry']
         cache_valid = False
-        if MONTHLY_STATS_CACHE['data'] is not None and MONTHLY_STATS_CACHE['timestamp'] is not None:
-            cache_age = datetime.now() - MONTHLY_STATS_CACHE['timestamp']
+        if entry is not None:
+            cache_age = datetime.now() - entry['timestamp']
             cache_valid = cache_age < timedelta(minutes=MONTHLY_STATS_CACHE['ttl_minutes'])
         
         if cache_valid:
             logger.info("Serving monthly stats from cache (instant)")
-            cached_response = MONTHLY_STATS_CACHE['data'].copy()
-            cached_response['source'] = 'cache'
-            cached_response['cached_at'] = MONTHLY_STATS_CACHE['timestamp'].isoformat()
-            return jsonify(cached_response)
+            return conditional_json(
+                entry['data'],
+                body=entry['body'],
+                etag=entry['etag'],
+                last_modified=entry['timestamp'],
+                weak=True
+            )
         
         # Cache miss or expired - fetch fresh data
         logger.info("Cache miss or expired, fetching fresh monthly stats data")
         
-        if DB_AVAILABLE and engine is not None:
-            # Try to query the pre-aggregated summary table first (MUCH faster)
-            try:
-                query = text("""
-                    SELECT 
-                        [YearMonth] AS month,
-                        [InsuranceType] AS insurance_type,
-                        [RecordCount] AS count
-                    FROM [dbo].[Tbl_MonthlyDataSummary]
-                    ORDER BY [YearMonth], [InsuranceType]
-                """)
-                with engine.connect() as conn:
-                    df = pd.read_sql(query, conn)
-                data_source = "summary_table"
-                logger.info("Using pre-aggregated summary table for monthly stats (fast)")
-            except Exception:
-                # Summary table doesn't exist or query failed, fall back to original aggregation
-                logger.info("Summary table 'Tbl_MonthlyDataSummary' not found or invalid. Using on-the-fly aggregation.")
-                query = text(f"""
-                    SELECT 
-                        FORMAT([{DATE_COLUMN}], 'yyyy-MM') AS month,
-                        [Insurance Type] AS insurance_type,
-                        COUNT(*) AS count
-                    FROM [{TABLE_SCHEMA}].[{DEFAULT_TABLE}]
-                    WHERE [{DATE_COLUMN}] IS NOT NULL
-                    GROUP BY FORMAT([{DATE_COLUMN}], 'yyyy-MM'), [Insurance Type]
-                    ORDER BY FORMAT([{DATE_COLUMN}], 'yyyy-MM')
-                """)
-                with engine.connect() as conn:
-                    df = pd.read_sql(query, conn)
-                data_source = "on_the_fly_aggregation"
-        else:
-            # Fallback: use sample data
-            df = FALLBACK_DF.copy()
-            if DATE_COLUMN in df.columns and "Insurance Type" in df.columns:
-                df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
-                df['month'] = df[DATE_COLUMN].dt.strftime('%Y-%m')
-                df = df.groupby(['month', 'Insurance Type']).size().reset_index(name='count')
-                df.rename(columns={'Insurance Type': 'insurance_type'}, inplace=True)
-            else:
-                # If columns don't exist, return empty structure
-                return jsonify({
-                    "months": [],
-                    "data": {},
-                    "totals": [],
-                    "fallback": True
-                })
-            data_source = "fallback_sample"
-
-        # Transform data into the desired format
-        months = sorted(df['month'].unique().tolist())
-        insurance_types = df['insurance_type'].unique().tolist()
-        
-        # Build data structure
-        data = {}
-        for ins_type in insurance_types:
-            data[ins_type] = []
-            for month in months:
-                count = df[(df['month'] == month) & (df['insurance_type'] == ins_type)]['count'].sum()
-                data[ins_type].append(int(count))
-        
-        # Calculate totals per month
-        totals = []
-        for month in months:
-            total = df[df['month'] == month]['count'].sum()
-            totals.append(int(total))
-        
-        response_data = {
-            "months": months,
-            "data": data,
-            "totals": totals,
-            "fallback": not DB_AVAILABLE,
-            "source": data_source
-        }
-        
-        # Store in cache
-        MONTHLY_STATS_CACHE['data'] = response_data
-        MONTHLY_STATS_CACHE['timestamp'] = datetime.now()
-        logger.info(f"Monthly stats cached successfully (expires in {MONTHLY_STATS_CACHE['ttl_minutes']} minutes)")
+        entry = build_monthly_stats()
+        if entry is None:
+            # If columns don't exist, return empty structure
+            return jsonify({
+                "months": [],
+                "data": {},
+                "totals": [],
+                "fallback": True
+            })
         
-        return jsonify(response_data)
+        return conditional_json(
+            entry['data'],
+            etag=entry['etag'],
+            last_modified=entry['timestamp'],
+            weak=True
+        )
     
     except Exception as e:
         logger.exception("Error in /api/monthly-stats")
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
+@app.route("/api/admin/profiles", methods=["GET"])
+def list_profiles():
+    """
+    Lists recent request profiles, newest first. Requires X-Admin-Token.
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    profiles = []
+    if os.path.isdir(PROFILER['dir']):
+        for name in sorted(os.listdir(PROFILER['dir']), reverse=True):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(PROFILER['dir'], name), encoding="utf-8") as f:
+                        profiles.append(json.load(f))
+                except FileNotFoundError:
+                    continue  # Pruned by _save_profile since listdir
+    return jsonify({"profiles": profiles})
+
+
+@app.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+def download_profile(profile_id):
+    """
+    Downloads a profile as a pstats (.prof) file. Requires X-Admin-Token.
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    return send_from_directory(PROFILER['dir'], f"{profile_id}.prof", as_attachment=True)
+
+
 @app.route("/api/clear-cache", methods=["POST"])
 def clear_cache():
     """
-    Clears the monthly stats cache.
+    Clears the monthly stats, columns, preview and export artifact caches.
     Useful when new data is added and you want to see it immediately.
     """
     global MONTHLY_STATS_CACHE
-    MONTHLY_STATS_CACHE['data'] = None
-    MONTHLY_STATS_CACHE['timestamp'] = None
-    logger.info("Monthly stats cache cleared manually")
+    MONTHLY_STATS_CACHE['entry'] = None
+    COLUMNS_CACHE['reports'].clear()
+    with PREVIEW_CACHE['lock']:
+        PREVIEW_CACHE['entries'].clear()
+    export_cache_clear()
+    logger.info("Monthly stats, columns, preview and export caches cleared manually")
     return jsonify({"message": "Cache cleared successfully"})
 
 
 @app.route("/api/export", methods=["GET"])
+@profiled
 def export_data():
     """
     Exports rows from the configured table as a CSV or XLSX file filtered by the date slicer.
@@ -580,128 +1682,97 @@ def export_data():
         cols_param = request.args.get("cols", None)
         categories_param = request.args.get("categories", None)
         report_type = request.args.get("report", "claims")
-        table_name = get_table_name(report_type)
-        date_col = REPORT_DATE_COLUMNS.get(report_type, DATE_COLUMN)
-
-        # Build select clause
-        if cols_param:
-            cols = [c.strip() for c in cols_param.split(",") if c.strip()]
-            # Basic safety: ensure column names don't contain semicolons, DROP, or suspicious tokens
-            safe_cols = []
-            for c in cols:
-                if ";" in c or "--" in c or "/*" in c:
-                    continue
-                # wrap in brackets
-                safe_cols.append(f"[{c}]")
-            if not safe_cols:
-                select_cols = "*"
-            else:
-                select_cols = ", ".join(safe_cols)
-        else:
-            select_cols = "*"
-
-        where_clauses = []
-        params_sql = {}
-        if from_date:
-            where_clauses.append(f"[{date_col}] >= :from_date")
-            params_sql["from_date"] = from_date
-        if to_date:
-            where_clauses.append(f"[{date_col}] <= :to_date")
-            params_sql["to_date"] = to_date
-            
-        if categories_param:
-            cats = [c.strip() for c in categories_param.split(",") if c.strip()]
-            if cats:
-                cat_params = []
-                for i, cat in enumerate(cats):
-                    pname = f"cat_{i}"
-                    cat_params.append(f":{pname}")
-                    params_sql[pname] = cat
-                
-                if report_type == 'complaints':
-                    where_clauses.append(f"[Product Type] IN ({', '.join(cat_params)})")
-                elif report_type == 'cea':
-                    where_clauses.append(f"[Policy Type (AI/HI)] IN ({', '.join(cat_params)})")
-
-        where_sql = ""
-        if where_clauses:
-            where_sql = " WHERE " + " AND ".join(where_clauses)
+        cols = [c.strip() for c in cols_param.split(",") if c.strip()] if cols_param else None
+        cats = [c.strip() for c in categories_param.split(",") if c.strip()] if categories_param else None
+        query, params_sql = build_export_query(report_type, from_date, to_date, cols, cats)
         
         current_engine, current_available = get_db_context(report_type)
 
+        # Serve repeat downloads straight from the export artifact cache
+        if file_format != 'xlsx':
+            file_format = 'csv'
+        extension = file_format
+        mimetype = EXPORT_MIMETYPES[file_format]
+        now = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        filename = f"{report_type}_export_{now}.{extension}"
+
+        fingerprint = export_fingerprint(
+            report_type,
+            file_format,
+            from_date,
+            to_date,
+            cols,
+            cats,
+        )
+        source_version = get_source_version(report_type)
+        cached_path = export_cache_get(fingerprint, source_version) if source_version is not None else None
+        if cached_path is not None:
+            try:
+                resp = send_artifact(open(cached_path, "rb"), filename, mimetype)
+            except FileNotFoundError:
+                # Evicted between the lookup and opening the file; rebuild it below
+                logger.info("Export artifact %s was evicted before it could be sent", fingerprint[:12])
+            else:
+                logger.info("Serving export %s from artifact cache", fingerprint[:12])
+                resp.headers["X-Export-Cache"] = "HIT"
+                if not current_available:
+                    resp.headers["X-Data-Source"] = "fallback-sample"
+                return resp
+
         if current_available and current_engine is not None:
-            query = text(f"SELECT {select_cols} FROM [{TABLE_SCHEMA}].[{table_name}]{where_sql}")
             with current_engine.connect() as conn:
                 df = pd.read_sql(query, conn, params=params_sql)
         else:
-            # fallback: select columns from FALLBACK_DF
-            df = FALLBACK_DF.copy()
-            if cols_param:
-                keep = [c for c in cols_param.split(",") if c in df.columns]
-                if keep:
-                    df = df[keep]
-            # apply date filters if possible
-            try:
-                if from_date and DATE_COLUMN in df.columns:
-                    df = df[pd.to_datetime(df[DATE_COLUMN]) >= pd.to_datetime(from_date)]
-                if to_date and DATE_COLUMN in df.columns:
-                    df = df[pd.to_datetime(df[DATE_COLUMN]) <= pd.to_datetime(to_date)]
-            except Exception:
-                # ignore date parse errors
-                pass
-            
-            except Exception:
-                # ignore date parse errors
-                pass
-            
-            except Exception:
-                # ignore date parse errors
-                pass
-            
-            if categories_param: 
-                cats = [c.strip() for c in categories_param.split(",") if c.strip()]
-                if cats:
-                    if report_type == 'complaints' and 'Product Type' in df.columns:
-                        df = df[df['Product Type'].isin(cats)]
-                    elif report_type == 'cea' and 'Policy Type (AI/HI)' in df.columns:
-                        df = df[df['Policy Type (AI/HI)'].isin(cats)]
+            df = fallback_export_df(report_type, from_date, to_date, cols, cats)
 
-        now = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        
-        if file_format == 'xlsx':
-            # Export as Excel
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Check for large dataset (limit 1M rows per sheet)
-                MAX_ROWS = 1000000
-                if len(df) > MAX_ROWS:
-                    total_rows = len(df)
-                    num_chunks = (total_rows // MAX_ROWS) + (1 if total_rows % MAX_ROWS else 0)
-                    for i in range(num_chunks):
-                        start_row = i * MAX_ROWS
-                        end_row = min((i + 1) * MAX_ROWS, total_rows)
-                        chunk = df.iloc[start_row:end_row]
-                        chunk.to_excel(writer, index=False, sheet_name=f'Report_Data_{i+1}')
-                else:
-                    df.to_excel(writer, index=False, sheet_name='Report_Data')
-            output.seek(0)
-            
-            filename = f"{report_type}_export_{now}.xlsx"
-            resp = Response(output.read(), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-            resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
-        else:
-            # Export as CSV (Default)
-            csv_buffer = io.StringIO()
-            df.to_csv(csv_buffer, index=False)
-            csv_value = csv_buffer.getvalue()
-            csv_buffer.close()
-
-            filename = f"{report_type}_export_{now}.csv"
-            resp = Response(csv_value, mimetype="text/csv")
-            resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
+        g.profile_row_count = len(df)
+
+        # Write the artifact to a temp file, then rename it into place so a
+        # concurrent request never sees a half-written file.
+        artifact_base = os.path.join(EXPORT_CACHE['dir'], f"{fingerprint[:16]}_{uuid.uuid4().hex[:8]}")
+        artifact_path = f"{artifact_base}.{extension}"
+        tmp_path = f"{artifact_base}.part.{extension}"
+        try:
+            if file_format == 'xlsx':
+                # Export as Excel
+                with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+                    # Check for large dataset (limit 1M rows per sheet)
+                    MAX_ROWS = 1000000
+                    if len(df) > MAX_ROWS:
+                        total_rows = len(df)
+                        num_chunks = (total_rows // MAX_ROWS) + (1 if total_rows % MAX_ROWS else 0)
+                        for i in range(num_chunks):
+                            start_row = i * MAX_ROWS
+                            end_row = min((i + 1) * MAX_ROWS, total_rows)
+                            chunk = df.iloc[start_row:end_row]
+                            chunk.to_excel(writer, index=False, sheet_name=f'Report_Data_{i+1}')
+                    else:
+                        df.to_excel(writer, index=False, sheet_name='Report_Data')
+            else:
+                # Export as CSV (Default)
+                df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, artifact_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        # Open before registering: once in the cache, a concurrent export or an
+        # eviction may remove the path before it is sent
+        artifact = open(artifact_path, "rb")
+        if source_version is not None:
+            export_cache_put(fingerprint, source_version, artifact_path)
+
+        resp = send_artifact(artifact, filename, mimetype)
+        resp.headers["X-Export-Cache"] = "MISS"
+        if source_version is None:
+            # Untracked by the cache (version unknown), so delete it once it has been sent.
+            # Passthrough responses skip Response.close(), so turn it off for the callback to run.
+            resp.direct_passthrough = False
+            resp.call_on_close(lambda: _remove_untracked_artifact(artifact_path))
         
         # include header to indicate fallback if used
-        if not DB_AVAILABLE:
+        if not current_available:
             resp.headers["X-Data-Source"] = "fallback-sample"
         return resp
 
@@ -710,6 +1781,38 @@ def export_data():
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
 
 
+@app.route("/api/export/bundle", methods=["GET", "POST"])
+def export_bundle():
+    """
+    Exports several reports as one streamed ZIP with a CSV member per report.
+    POST JSON body:
+      - reports: list of report names, or objects {report, from, to, cols, categories}
+        whose filters override the shared ones; a comma-separated string also works
+      - from, to, cols, categories: (optional) filters shared by all reports
+    GET query params: reports (comma-separated) plus shared from, to, cols, categories.
+    Reports are queried concurrently on their own engines; reports whose DB is
+    unavailable get sample data.
+    """
+    try:
+        if request.method == "POST":
+            payload = request.get_json(silent=True) or {}
+        else:
+            payload = request.args.to_dict()
+        specs = parse_bundle_specs(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    now = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    resp = Response(stream_with_context(stream_bundle_zip(specs)), mimetype="application/zip")
+    resp.headers["Content-Disposition"] = f"attachment; filename=bundle_export_{now}.zip"
+    return resp
+
+
+# Initialize engine / test connectivity at startup (after all helpers are
+# defined, since a successful connection also starts the cache warm-up)
+try_create_engine()
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     # Try to create engine on startup again (useful if network flapped)
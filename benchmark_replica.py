@@ -0,0 +1,81 @@
+"""
+Benchmark: SQL Server vs the local analytics replica (Parquet + DuckDB).
+
+Usage:
+    python benchmark_replica.py               # 5 runs per endpoint and path
+    python benchmark_replica.py --runs 10 --report complaints
+
+Syncs the replica first (this can take a while on the first run), then calls
+/api/preview, /api/monthly-stats, /api/categories and /api/dates through the
+Flask test client with the replica disabled and enabled. In-memory caches are
+cleared before every call so each one reaches a data source.
+Requires a reachable database and the duckdb package.
+"""
+import argparse
+import statistics
+import time
+
+import app as service
+
+
+def clear_caches():
+    service.MONTHLY_STATS_CACHE['entry'] = None
+    with service.METADATA_INDEX['lock']:
+        service.METADATA_INDEX['reports'].clear()
+
+
+def time_endpoint(client, url, runs):
+    timings = []
+    for _ in range(runs):
+        clear_caches()
+        start = time.perf_counter()
+        resp = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{url} returned {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--report', default='claims', choices=sorted(service.REPORT_TABLES))
+    parser.add_argument('--from', dest='from_date', default=None, help='Preview start date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='to_date', default=None, help='Preview end date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    if not service.replica.DUCKDB_AVAILABLE:
+        raise SystemExit("duckdb is not installed (pip install duckdb)")
+    if not service.DB_AVAILABLE:
+        raise SystemExit("Database is not reachable; nothing to compare against")
+
+    service.ANALYTICS_REPLICA['enabled'] = True
+    print("Syncing replica...")
+    start = time.perf_counter()
+    service.refresh_replica()
+    print(f"  done in {time.perf_counter() - start:.1f}s\n")
+
+    preview_url = f"/api/preview?n=100&report={args.report}"
+    if args.from_date:
+        preview_url += f"&from={args.from_date}"
+    if args.to_date:
+        preview_url += f"&to={args.to_date}"
+    category_report = 'cea' if args.report == 'cea' else 'complaints'
+    urls = [
+        preview_url,
+        "/api/monthly-stats",
+        f"/api/categories?report={category_report}",
+        f"/api/dates?report={args.report}",
+    ]
+
+    client = service.app.test_client()
+    print(f"{'endpoint':<45} {'path':<12} {'median ms':>10} {'min ms':>10}")
+    for url in urls:
+        for label, enabled in (('sql_server', False), ('replica', True)):
+            service.ANALYTICS_REPLICA['enabled'] = enabled
+            median_ms, min_ms = time_endpoint(client, url, args.runs)
+            print(f"{url:<45} {label:<12} {median_ms:>10.1f} {min_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
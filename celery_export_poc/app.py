@@ -1,5 +1,10 @@
 import os
-from flask import Flask, jsonify, request, send_file, url_for
+import json
+import time
+import mimetypes
+import threading
+import redis
+from flask import Flask, Response, jsonify, request, send_from_directory, stream_with_context, url_for
 from celery import Celery, states
 
 # --- Config ---
@@ -9,6 +14,28 @@ REDIS_URL = 'redis://localhost:6379/0'
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'temp_exports')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Progress events are published by the task on this Redis pub/sub channel and
+# relayed to the browser over Server-Sent Events (see /api/export/events).
+PROGRESS_CHANNEL = 'export_progress:{job_id}'
+PROGRESS_INTERVAL_SECONDS = 1.0  # Minimum time between progress updates from the task
+SSE_HEARTBEAT_SECONDS = 15       # Keeps idle connections open through proxies
+SSE_MAX_PENDING_CHECKS = 40      # Idle checks (~10 min) a job may stay PENDING before the stream ends
+
+# Retention for temp_exports: the janitor deletes artifacts older than the max age,
+# then the oldest artifacts until total size fits the quota.
+EXPORT_MAX_AGE_HOURS = float(os.environ.get('EXPORT_MAX_AGE_HOURS', 24))
+EXPORT_MAX_TOTAL_MB = float(os.environ.get('EXPORT_MAX_TOTAL_MB', 20480))
+EXPORT_PART_MAX_AGE_HOURS = 12   # Abandoned .part files from crashed workers
+JANITOR_INTERVAL_SECONDS = 300
+
+EXPORT_METRICS = {
+    'evicted_age': 0,
+    'evicted_quota': 0,
+    'evicted_bytes': 0,
+    'last_run': None,
+    'lock': threading.Lock()
+}
+
 app = Flask(__name__)
 app.config['CELERY_BROKER_URL'] = REDIS_URL
 app.config['CELERY_RESULT_BACKEND'] = REDIS_URL
@@ -32,6 +59,7 @@ def make_celery(app):
     return celery
 
 celery = make_celery(app)
+redis_client = redis.Redis.from_url(REDIS_URL)
 
 # Import tasks after creating celery instance to avoid circular imports
 # In a real package, this might be handled differently. 
@@ -55,7 +83,8 @@ def start_export():
     return jsonify({
         'job_id': task.id,
         'message': 'Export started',
-        'status_url': url_for('get_status', job_id=task.id, _external=True)
+        'status_url': url_for('get_status', job_id=task.id, _external=True),
+        'events_url': url_for('export_events', job_id=task.id, _external=True)
     }), 202
 
 @app.route('/api/export/status/<job_id>', methods=['GET'])
@@ -91,23 +120,190 @@ def get_status(job_id):
     
     return jsonify(response)
 
+def _sse(event):
+    """Formats a dict as a single Server-Sent Events message."""
+    return f"data: {json.dumps(event)}\n\n"
+
+def _current_state_event(job_id):
+    """Reads the job state once from the result backend as an event dict."""
+    task = tasks.generate_csv_export.AsyncResult(job_id)
+    if task.state == 'SUCCESS':
+        return dict(task.result, state='SUCCESS')
+    if task.state == 'FAILURE':
+        return {'state': 'FAILURE', 'error': str(task.info)}
+    event = {'state': task.state}
+    if isinstance(task.info, dict):
+        event.update(task.info)
+    return event
+
+def _with_download_url(event):
+    """Adds download_url to a SUCCESS event so the client can fetch the file."""
+    if event.get('state') == 'SUCCESS' and event.get('filename'):
+        event['download_url'] = url_for('download_file', filename=event['filename'], _external=True)
+    return event
+
+@app.route('/api/export/events/<job_id>', methods=['GET'])
+def export_events(job_id):
+    """
+    Streams progress for a job as Server-Sent Events.
+    One long-lived connection per job replaces repeated status polling; the
+    stream ends after a SUCCESS or FAILURE event. Celery reports unknown job
+    ids as PENDING, so a job still PENDING after SSE_MAX_PENDING_CHECKS idle
+    checks ends the stream with a TIMEOUT event.
+    """
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+
+    def generate():
+        try:
+            # Subscribe before reading the current state so no event is missed in between
+            pubsub.subscribe(PROGRESS_CHANNEL.format(job_id=job_id))
+            initial = _current_state_event(job_id)
+            yield _sse(_with_download_url(initial))
+            if initial['state'] in states.READY_STATES:
+                return
+            pending_checks = 0
+            while True:
+                message = pubsub.get_message(timeout=SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    # Idle: re-check the backend in case the final event was
+                    # published before we subscribed
+                    event = _current_state_event(job_id)
+                    if event['state'] in states.READY_STATES:
+                        yield _sse(_with_download_url(event))
+                        return
+                    pending_checks = pending_checks + 1 if event['state'] == states.PENDING else 0
+                    if pending_checks >= SSE_MAX_PENDING_CHECKS:
+                        yield _sse({'state': 'TIMEOUT', 'error': 'Job was not picked up by a worker (or the job id is unknown)'})
+                        return
+                    yield ": heartbeat\n\n"
+                    continue
+                event = _with_download_url(json.loads(message['data']))
+                yield _sse(event)
+                if event.get('state') in states.READY_STATES:
+                    return
+        finally:
+            pubsub.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/export/download/<filename>', methods=['GET'])
 def download_file(filename):
     """
     Streams the generated file to the client.
+    Supports ETag/If-None-Match and HTTP Range requests, so an interrupted
+    download of a multi-GB export can resume instead of restarting.
     """
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
-    if not os.path.exists(file_path):
+    if filename.endswith('.part') or not os.path.isfile(file_path):
         return jsonify({'error': 'File not found'}), 404
 
-    # sending file as attachment
-    return send_file(
-        file_path,
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # sending file as attachment; conditional=True enables Range and 304 handling
+    return send_from_directory(
+        app.config['UPLOAD_FOLDER'],
+        filename,
         as_attachment=True,
         download_name=filename,
-        mimetype='text/csv'
+        mimetype=mimetype,
+        conditional=True,
+        etag=True
     )
 
+@app.route('/api/export/metrics', methods=['GET'])
+def export_metrics():
+    """
+    Returns temp_exports disk usage and janitor eviction counts.
+    """
+    disk_bytes, file_count = _scan_export_folder()[1:]
+    with EXPORT_METRICS['lock']:
+        return jsonify({
+            'disk_bytes': disk_bytes,
+            'file_count': file_count,
+            'evicted_age': EXPORT_METRICS['evicted_age'],
+            'evicted_quota': EXPORT_METRICS['evicted_quota'],
+            'evicted_bytes': EXPORT_METRICS['evicted_bytes'],
+            'last_run': EXPORT_METRICS['last_run'],
+            'max_age_hours': EXPORT_MAX_AGE_HOURS,
+            'max_total_mb': EXPORT_MAX_TOTAL_MB
+        })
+
+# --- Export Janitor ---
+
+def _scan_export_folder():
+    """
+    Returns ([(mtime, size, path, is_part)], total_bytes, file_count) for UPLOAD_FOLDER.
+    """
+    entries = []
+    total = 0
+    for entry in os.scandir(app.config['UPLOAD_FOLDER']):
+        if not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue  # Renamed from .part or evicted since scandir
+        entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name.endswith('.part')))
+        total += stat.st_size
+    return entries, total, len(entries)
+
+def _evict(path, size, reason):
+    try:
+        os.remove(path)
+    except OSError:
+        # Still being written or downloaded (Windows); retry on the next run
+        return False
+    with EXPORT_METRICS['lock']:
+        EXPORT_METRICS[f'evicted_{reason}'] += 1
+        EXPORT_METRICS['evicted_bytes'] += size
+    return True
+
+def run_export_janitor():
+    """
+    One janitor pass: drop expired artifacts, then the oldest finished artifacts
+    until the folder fits within EXPORT_MAX_TOTAL_MB.
+    """
+    entries, total, _ = _scan_export_folder()
+    now = time.time()
+    remaining = []
+    for mtime, size, path, is_part in entries:
+        max_age = EXPORT_PART_MAX_AGE_HOURS if is_part else EXPORT_MAX_AGE_HOURS
+        if now - mtime > max_age * 3600 and _evict(path, size, 'age'):
+            total -= size
+        else:
+            remaining.append((mtime, size, path, is_part))
+
+    quota = EXPORT_MAX_TOTAL_MB * 1024 * 1024
+    for mtime, size, path, is_part in sorted(remaining):
+        if total <= quota:
+            break
+        # In-progress .part files are only removed by age
+        if not is_part and _evict(path, size, 'quota'):
+            total -= size
+
+    with EXPORT_METRICS['lock']:
+        EXPORT_METRICS['last_run'] = now
+
+def start_export_janitor():
+    """Runs run_export_janitor every JANITOR_INTERVAL_SECONDS in a daemon thread."""
+    def loop():
+        while True:
+            try:
+                run_export_janitor()
+            except Exception:
+                app.logger.exception('Export janitor pass failed')
+            time.sleep(JANITOR_INTERVAL_SECONDS)
+
+    threading.Thread(target=loop, name='export-janitor', daemon=True).start()
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
+    debug = True
+    # With the debug reloader, only start the janitor in the serving child process
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_export_janitor()
+    app.run(debug=debug, port=5001)
@@ -0,0 +1,73 @@
+"""
+Benchmark: per-row writerow() vs batched writerows() for the CSV export task.
+
+Usage:
+    python benchmark_export.py                   # 1M and 15M synthetic rows
+    python benchmark_export.py --rows 1000000    # custom row counts
+
+Both paths read the same synthetic fetchmany() batches, so the difference is
+the per-row Python overhead of the writer loop plus the larger file buffer.
+The fetch-only line shows how much of each run is spent building the rows.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from export_writer import BATCH_SIZE, EXPORT_HEADERS, fetch_data_batches, write_csv_batches
+
+
+def write_per_row(file_path, headers, batches):
+    """Baseline: the previous task loop (writerow per row + modulo check)."""
+    row_count = 0
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for batch in batches:
+            for row in batch:
+                writer.writerow(row)
+                row_count += 1
+                if row_count % 100 == 0:
+                    pass  # stands in for the old per-100-row update_state check
+    return row_count
+
+
+def fetch_only(file_path, headers, batches):
+    """Reference: cost of producing the synthetic batches without writing."""
+    row_count = 0
+    for batch in batches:
+        row_count += len(batch)
+    with open(file_path, 'w') as f:
+        f.write('')
+    return row_count
+
+
+def run(label, write_fn, rows, batch_size, out_dir):
+    file_path = os.path.join(out_dir, f"bench_{label}.csv")
+    start = time.perf_counter()
+    written = write_fn(file_path, EXPORT_HEADERS, fetch_data_batches(limit=rows, batch_size=batch_size))
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    os.remove(file_path)
+    print(f"  {label:<10} {written:>12,} rows  {elapsed:8.2f}s  {written / elapsed:>12,.0f} rows/s  {size_mb:8.1f} MB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000000, 15000000])
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        for rows in args.rows:
+            print(f"{rows:,} rows (batch size {args.batch_size:,}):")
+            run('fetch-only', fetch_only, rows, args.batch_size, out_dir)
+            per_row = run('per-row', write_per_row, rows, args.batch_size, out_dir)
+            batched = run('batched', write_csv_batches, rows, args.batch_size, out_dir)
+            print(f"  speedup    {per_row / batched:.2f}x\n")
+
+
+if __name__ == '__main__':
+    main()
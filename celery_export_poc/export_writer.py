@@ -0,0 +1,54 @@
+import csv
+import os
+
+# Writer tuning for large (15M+ row) exports
+BATCH_SIZE = 10000                      # Rows per fetchmany() call
+WRITE_BUFFER_BYTES = 8 * 1024 * 1024    # File buffer size; fewer, larger write() syscalls
+
+EXPORT_HEADERS = ['id', 'name', 'email', 'transaction_value', 'timestamp']
+
+
+def fetch_data_batches(limit=1000, batch_size=BATCH_SIZE):
+    """
+    Generator simulating cursor.fetchmany() on a Server-Side Cursor.
+    Yields lists of up to batch_size rows.
+    """
+    # Simulating 15M rows with 1000 by default for a quick POC; raise limit to test
+    for start in range(0, limit, batch_size):
+        yield [
+            (
+                i,
+                f"User_{i}",
+                f"user_{i}@example.com",
+                round(i * 1.5, 2),
+                "2023-10-27 10:00:00"
+            )
+            for i in range(start, min(start + batch_size, limit))
+        ]
+
+
+def write_csv_batches(file_path, headers, batches, on_batch=None):
+    """
+    Writes headers and row batches to file_path with one writerows() call per batch.
+    Output goes to a temp file that is renamed into place when complete, so a
+    partially written export is never visible under its final name.
+    on_batch(row_count) is called after each batch, e.g. for progress reporting.
+    Returns the number of data rows written.
+    """
+    tmp_path = file_path + '.part'
+    row_count = 0
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8', buffering=WRITE_BUFFER_BYTES) as f:
+            writer = csv.writer(f)
+            writer.writerow(headers)
+            for batch in batches:
+                writer.writerows(batch)
+                row_count += len(batch)
+                if on_batch is not None:
+                    on_batch(row_count)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return row_count
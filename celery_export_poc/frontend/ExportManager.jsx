@@ -4,7 +4,7 @@ const ExportManager = () => {
     const [status, setStatus] = useState('IDLE'); // IDLE, PROCESSING, SUCCESS, FAILURE
     const [jobId, setJobId] = useState(null);
     const [message, setMessage] = useState('');
-    const pollInterval = useRef(null);
+    const eventSource = useRef(null);
 
     const startExport = async () => {
         try {
@@ -22,8 +22,8 @@ const ExportManager = () => {
             if (response.status === 202) {
                 setJobId(data.job_id);
                 setMessage('Export started. Processing...');
-                // Start polling
-                pollInterval.current = setInterval(() => checkStatus(data.job_id), 2000);
+                // Subscribe to server-pushed progress events
+                listenForProgress(data.job_id);
             } else {
                 setStatus('FAILURE');
                 setMessage('Failed to start export.');
@@ -35,37 +35,47 @@ const ExportManager = () => {
         }
     };
 
-    const checkStatus = async (id) => {
-        try {
-            const response = await fetch(`/api/export/status/${id}`);
-            const data = await response.json();
+    const closeStream = () => {
+        if (eventSource.current) {
+            eventSource.current.close();
+            eventSource.current = null;
+        }
+    };
+
+    const listenForProgress = (id) => {
+        closeStream();
+        const source = new EventSource(`/api/export/events/${id}`);
+        eventSource.current = source;
+
+        source.onmessage = (event) => {
+            const data = JSON.parse(event.data);
 
             if (data.state === 'SUCCESS') {
-                clearInterval(pollInterval.current);
+                closeStream();
                 setStatus('SUCCESS');
                 setMessage('Export complete! Downloading now...');
                 // Trigger download
                 window.location.href = data.download_url;
-            } else if (data.state === 'FAILURE') {
-                clearInterval(pollInterval.current);
+            } else if (data.state === 'FAILURE' || data.state === 'REVOKED' || data.state === 'TIMEOUT') {
+                closeStream();
                 setStatus('FAILURE');
-                setMessage(`Export failed: ${data.error}`);
+                setMessage(`Export failed: ${data.error || data.state}`);
             } else {
                 // Still PENDING or STARTED
-                setMessage(`Processing... ${data.result?.current_row ? `(${data.result.current_row} rows)` : ''}`);
+                setMessage(`Processing... ${data.current_row ? `(${data.current_row} rows)` : ''}`);
             }
-        } catch (error) {
-            console.error('Error checking status:', error);
-            // Don't stop polling on transient network errors, maybe?
-            // For now, we continue polling.
-        }
+        };
+
+        source.onerror = (error) => {
+            // EventSource reconnects on its own after transient network errors;
+            // the server replays the current state on reconnect.
+            console.error('Progress stream error:', error);
+        };
     };
 
     // Cleanup on unmount
     useEffect(() => {
-        return () => {
-            if (pollInterval.current) clearInterval(pollInterval.current);
-        };
+        return () => closeStream();
     }, []);
 
     return (
@@ -1,65 +1,53 @@
 import time
-import csv
 import os
+import json
 import uuid
-from app import celery, app
+from app import celery, app, redis_client, PROGRESS_CHANNEL, PROGRESS_INTERVAL_SECONDS
+from export_writer import EXPORT_HEADERS, fetch_data_batches, write_csv_batches
 
 # Setup for pseudo-DB connection
 # In a real scenario: import psycopg2 / from sqlalchemy import create_engine
 
-def fetch_data_stream(limit=15000000):
-    """
-    Generator function simulating a Server-Side Cursor.
-    Yields rows one by one or in small batches.
-    """
-    # Simulate streaming 15M rows (scaled down for POC speed, change limit to test)
-    # Using a smaller number for demonstration unless we want to wait a long time
-    demo_limit = 1000 # Simulating 15M with 1000 for quick POC
-    
-    headers = ['id', 'name', 'email', 'transaction_value', 'timestamp']
-    yield headers # yield headers first
-    
-    for i in range(demo_limit):
-        # Simulate processing time per row (very fast)
-        # yield a tuple/list representing a row
-        yield (
-            i, 
-            f"User_{i}", 
-            f"user_{i}@example.com", 
-            round(i * 1.5, 2), 
-            "2023-10-27 10:00:00"
-        )
+def publish_progress(job_id, event):
+    """Publishes a progress event for the SSE stream of this job."""
+    redis_client.publish(PROGRESS_CHANNEL.format(job_id=job_id), json.dumps(event))
 
 @celery.task(bind=True)
 def generate_csv_export(self):
     """
     Celery task to generate a large CSV file.
-    Uses a streaming generator to write to disk without loading all data into RAM.
+    Streams the cursor in batches to disk without loading all data into RAM.
     """
     job_id = self.request.id
     filename = f"export_{job_id}.csv"
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
-    self.update_state(state='STARTED', meta={'status': 'Preparing to query database...'})
+    meta = {'status': 'Preparing to query database...'}
+    self.update_state(state='STARTED', meta=meta)
+    publish_progress(job_id, dict(meta, state='STARTED'))
     
+    last_progress = [time.monotonic()]
+
+    def report_progress(row_count):
+        # Report progress at most once per PROGRESS_INTERVAL_SECONDS, not per N rows,
+        # so result backend writes stay constant regardless of table size
+        if time.monotonic() - last_progress[0] >= PROGRESS_INTERVAL_SECONDS:
+            last_progress[0] = time.monotonic()
+            meta = {'current_row': row_count, 'status': 'Writing rows...'}
+            self.update_state(state='STARTED', meta=meta)
+            publish_progress(job_id, dict(meta, state='STARTED'))
+
     try:
-        # Open file for writing
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            
-            # Use the streaming cursor function
-            # In production, pass the actual DB cursor here
-            row_count = 0
-            for row in fetch_data_stream():
-                writer.writerow(row)
-                row_count += 1
-                
-                # Optional: Update status every N rows
-                if row_count % 100 == 0:
-                     self.update_state(state='STARTED', meta={'current_row': row_count, 'status': 'Writing rows...'})
+        # Consume the cursor in fetchmany() batches; each batch is encoded with a
+        # single writerows() call into a large buffered file, written atomically.
+        # In production, pass batches from the actual DB cursor here
+        row_count = write_csv_batches(file_path, EXPORT_HEADERS, fetch_data_batches(), on_batch=report_progress)
         
-        return {'filename': filename, 'total_rows': row_count, 'status': 'Task completed!'}
+        result = {'filename': filename, 'total_rows': row_count, 'status': 'Task completed!'}
+        publish_progress(job_id, dict(result, state='SUCCESS'))
+        return result
 
     except Exception as e:
         self.update_state(state='FAILURE', meta={'error': str(e)})
+        publish_progress(job_id, {'state': 'FAILURE', 'error': str(e)})
         raise e
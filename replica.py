@@ -0,0 +1,270 @@
+"""
+Local columnar analytics replica.
+
+Snapshots the SQL Server report tables into Parquet files on local disk, one
+directory per month of the report's date column, and answers preview and
+rollup queries from them with DuckDB. Partitions are re-pulled only when their
+row count on the server changes, plus the latest month on every sync.
+
+Optional: requires the duckdb package (pip install duckdb). app.py only uses
+the replica when ANALYTICS_REPLICA=1 and the replica is fresh.
+"""
+import os
+import json
+import shutil
+import threading
+import logging
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    duckdb = None
+    DUCKDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+NULL_PARTITION = "none"         # Rows whose date column is NULL
+STATE_FILE = "_state.json"
+FETCH_CHUNK_ROWS = 200000       # Rows per Parquet file when pulling a partition
+
+# In-memory view of each report's replica, mirrored to <dir>/<report>/_state.json
+REPLICA_STATE = {
+    'reports': {},  # report_type -> {synced_at, source_version, partitions: {month: row_count}, stale}
+    'lock': threading.Lock()
+}
+
+
+def _report_dir(base_dir, report_type):
+    return os.path.join(base_dir, report_type)
+
+
+def _quote(name):
+    """Quotes an identifier for DuckDB (column names contain spaces)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _as_timestamp(name):
+    # Date columns normally arrive as TIMESTAMP; cast so VARCHAR dates compare correctly too
+    return f"CAST({_quote(name)} AS TIMESTAMP)"
+
+
+def _parquet_source(base_dir, report_type):
+    pattern = os.path.join(_report_dir(base_dir, report_type), "month=*", "*.parquet").replace("\\", "/")
+    return f"read_parquet('{pattern}', hive_partitioning = false, union_by_name = true)"
+
+
+def _month_bounds(month):
+    """Returns the [start, end) dates for a 'YYYY-MM' partition."""
+    start = datetime.strptime(month, "%Y-%m")
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+# ---------- STATE ----------
+
+def load_state(base_dir, report_type):
+    """
+    Loads a report's replica state from disk into REPLICA_STATE, so a restart
+    reuses the existing snapshot. Returns the state or None.
+    """
+    path = os.path.join(_report_dir(base_dir, report_type), STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        state = {
+            'synced_at': datetime.fromisoformat(raw['synced_at']),
+            'source_version': tuple(raw['source_version']) if raw['source_version'] is not None else None,
+            'partitions': raw['partitions'],
+            'stale': False
+        }
+    except Exception as e:
+        logger.warning("Ignoring unreadable replica state for %s. Error: %s", report_type, str(e))
+        return None
+    with REPLICA_STATE['lock']:
+        REPLICA_STATE['reports'][report_type] = state
+    return state
+
+
+def _save_state(base_dir, report_type, state):
+    path = os.path.join(_report_dir(base_dir, report_type), STATE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            'synced_at': state['synced_at'].isoformat(),
+            'source_version': list(state['source_version']) if state['source_version'] is not None else None,
+            'partitions': state['partitions']
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def is_fresh(report_type, max_staleness_minutes):
+    """
+    True if the report has a replica that was verified against the source
+    within max_staleness_minutes and no pending change was detected since.
+    """
+    state = REPLICA_STATE['reports'].get(report_type)
+    if state is None or state['stale']:
+        return False
+    return datetime.now() - state['synced_at'] < timedelta(minutes=max_staleness_minutes)
+
+
+def mark_verified(base_dir, report_type):
+    """Records that the replica still matches the source (nothing to pull)."""
+    with REPLICA_STATE['lock']:
+        state = REPLICA_STATE['reports'][report_type]
+        state['synced_at'] = datetime.now()
+        state['stale'] = False
+    _save_state(base_dir, report_type, state)
+
+
+def mark_stale(report_type):
+    """Stops queries from using the replica until the next successful sync."""
+    with REPLICA_STATE['lock']:
+        state = REPLICA_STATE['reports'].get(report_type)
+        if state is not None:
+            state['stale'] = True
+
+
+# ---------- SYNC ----------
+
+def _write_partition(conn, report_dir, schema, table, date_col, month):
+    """Pulls one month from SQL Server into <report_dir>/month=<month>/part-NNNN.parquet."""
+    if month == NULL_PARTITION:
+        where_sql = f"[{date_col}] IS NULL"
+        params_sql = {}
+    else:
+        where_sql = f"[{date_col}] >= :start AND [{date_col}] < :end"
+        start, end = _month_bounds(month)
+        params_sql = {"start": start, "end": end}
+
+    final_dir = os.path.join(report_dir, f"month={month}")
+    tmp_dir = os.path.join(report_dir, f".month={month}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    query = text(f"SELECT * FROM [{schema}].[{table}] WHERE {where_sql}")
+    con = duckdb.connect()
+    try:
+        for i, chunk in enumerate(pd.read_sql(query, conn, params=params_sql, chunksize=FETCH_CHUNK_ROWS)):
+            path = os.path.join(tmp_dir, f"part-{i:04d}.parquet").replace("\\", "/")
+            con.register("chunk", chunk)
+            con.execute(f"COPY chunk TO '{path}' (FORMAT PARQUET)")
+            con.unregister("chunk")
+    finally:
+        con.close()
+
+    # Swap the new partition into place
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+
+
+def sync_report(base_dir, report_type, engine, schema, table, date_col, source_version):
+    """
+    Brings a report's replica up to date with SQL Server, one month partition
+    at a time. Only partitions whose row count changed are re-pulled, plus the
+    most recent month (rows there may be updated in place). Returns the list
+    of partitions that were written.
+    """
+    report_dir = _report_dir(base_dir, report_type)
+    os.makedirs(report_dir, exist_ok=True)
+    state = REPLICA_STATE['reports'].get(report_type) or load_state(base_dir, report_type)
+    local = dict(state['partitions']) if state is not None else {}
+
+    month_expr = f"FORMAT([{date_col}], 'yyyy-MM')"
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT {month_expr}, COUNT(*) FROM [{schema}].[{table}] GROUP BY {month_expr}"
+        )).fetchall()
+        remote = {(r[0] or NULL_PARTITION): int(r[1]) for r in rows}
+
+        months = sorted(m for m in remote if m != NULL_PARTITION)
+        latest = months[-1] if months else None
+        changed = [m for m, count in remote.items() if local.get(m) != count or m == latest]
+        for month in changed:
+            _write_partition(conn, report_dir, schema, table, date_col, month)
+            local[month] = remote[month]
+
+    for month in [m for m in local if m not in remote]:
+        shutil.rmtree(os.path.join(report_dir, f"month={month}"), ignore_errors=True)
+        del local[month]
+
+    new_state = {
+        'synced_at': datetime.now(),
+        'source_version': source_version,
+        'partitions': local,
+        'stale': False
+    }
+    _save_state(base_dir, report_type, new_state)
+    with REPLICA_STATE['lock']:
+        REPLICA_STATE['reports'][report_type] = new_state
+    logger.info("Replica for %s synced (%d partitions written)", report_type, len(changed))
+    return changed
+
+
+# ---------- QUERIES ----------
+
+def _query(base_dir, report_type, sql, params=None):
+    """Runs sql against the report's Parquet files (exposed as 'src') and returns a DataFrame."""
+    con = duckdb.connect()
+    try:
+        return con.execute(sql.replace("{src}", _parquet_source(base_dir, report_type)), params or []).df()
+    finally:
+        con.close()
+
+
+def preview(base_dir, report_type, n, date_col, from_date=None, to_date=None, cols=None,
+            category_col=None, categories=None):
+    """Replica equivalent of the /api/preview SQL Server query."""
+    select_cols = ", ".join(_quote(c) for c in cols) if cols else "*"
+    where_clauses = []
+    params = []
+    if from_date:
+        where_clauses.append(f"{_as_timestamp(date_col)} >= CAST(? AS TIMESTAMP)")
+        params.append(from_date)
+    if to_date:
+        where_clauses.append(f"{_as_timestamp(date_col)} <= CAST(? AS TIMESTAMP)")
+        params.append(to_date)
+    if category_col and categories:
+        where_clauses.append(f"{_quote(category_col)} IN ({', '.join('?' for _ in categories)})")
+        params.extend(categories)
+
+    where_sql = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    return _query(base_dir, report_type, f"SELECT {select_cols} FROM {{src}}{where_sql} LIMIT {int(n)}", params)
+
+
+def monthly_stats(base_dir, report_type, date_col, type_col):
+    """Returns a DataFrame of (month, insurance_type, count) rows."""
+    return _query(base_dir, report_type, f"""
+        SELECT
+            strftime({_as_timestamp(date_col)}, '%Y-%m') AS month,
+            {_quote(type_col)} AS insurance_type,
+            COUNT(*) AS count
+        FROM {{src}}
+        WHERE {_quote(date_col)} IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1
+    """)
+
+
+def date_bounds(base_dir, report_type, date_col):
+    """Returns (min, max) of the date column."""
+    df = _query(base_dir, report_type, f"SELECT MIN({_quote(date_col)}), MAX({_quote(date_col)}) FROM {{src}}")
+    min_value, max_value = df.iloc[0, 0], df.iloc[0, 1]
+    return (None if pd.isna(min_value) else min_value), (None if pd.isna(max_value) else max_value)
+
+
+def category_counts(base_dir, report_type, category_col):
+    """Returns {category value: row count}, excluding NULLs."""
+    df = _query(base_dir, report_type, f"""
+        SELECT {_quote(category_col)}, COUNT(*) FROM {{src}}
+        WHERE {_quote(category_col)} IS NOT NULL
+        GROUP BY 1
+    """)
+    return {row[0]: int(row[1]) for row in df.itertuples(index=False)}